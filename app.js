@@ -126,10 +126,11 @@ async function startQuiz(
 
     const count = questionCount.value;
     const difficulty = difficultySelect.value;
+    const roomCode = new URLSearchParams(window.location.search).get("room") || "";
 
     try {
         const res = await fetch(
-            `https://festquiz.onrender.com/quiz?amount=${count}&category=${selectedCategory}&difficulty=${difficulty}`
+            `https://festquiz.onrender.com/quiz?amount=${count}&category=${selectedCategory}&difficulty=${difficulty}&room=${encodeURIComponent(roomCode)}`
         );
 
         if (!res.ok) throw new Error("Fetch failed");
@@ -216,54 +217,51 @@ function showQuestion(questionText, answersDiv) {
 
     // 🔁 AUTO-NEXT KOPPLING (DET SOM SAKNADES)
     autoNextTriggered = false;
-    watchForAutoNext(questionText, answersDiv);
+    watchForAutoNext(questionText, answersDiv, questionId);
 }
 
 // ================== AUTO NEXT + LADD-SIDA ==================
 let autoNextTriggered = false;
 
-function watchForAutoNext(questionText, answersDiv) {
+function watchForAutoNext(questionText, answersDiv, questionId) {
     const params = new URLSearchParams(window.location.search);
     const roomCode = params.get("room");
-    if (!roomCode) return;
+    if (!roomCode || typeof window.onV2Room !== "function") return;
 
-    const statusEl = document.getElementById("statusText");
-
-    const interval = setInterval(async () => {
-        if (mode !== "quiz" || autoNextTriggered) return;
-
-        try {
-            const res = await fetch(`/room/${roomCode}`);
-            if (!res.ok) return;
+    // Room-state pushas från servern (index.html), ingen egen polling
+    const unsubscribe = window.onV2Room(data => {
+        if (mode !== "quiz") {
+            unsubscribe();
+            return;
+        }
+        if (autoNextTriggered) return;
 
-            const data = await res.json();
+        // Ignorera state från föregående fråga
+        if (data.current_question?.id !== questionId) return;
 
-            if (data.answers_locked === true && data.last_result) {
-                autoNextTriggered = true;
+        if (data.answers_locked === true && data.last_result) {
+            autoNextTriggered = true;
+            unsubscribe();
 
-                const { right, wrong } = data.last_result;
+            const { right, wrong } = data.last_result;
 
-                // 🧱 VISA LADD-SIDA
-                questionText.textContent = "Svar låsta";
-                answersDiv.innerHTML = `
-                    <div style="font-size:1.5rem; margin-top:20px;">
-                        ✅ Rätt: ${right}<br>
-                        ❌ Fel: ${wrong}
-                    </div>
-                    <div style="opacity:.7; margin-top:12px;">
-                        Nästa fråga laddas…
-                    </div>
-                `;
+            // 🧱 VISA LADD-SIDA
+            questionText.textContent = "Svar låsta";
+            answersDiv.innerHTML = `
+                <div style="font-size:1.5rem; margin-top:20px;">
+                    ✅ Rätt: ${right}<br>
+                    ❌ Fel: ${wrong}
+                </div>
+                <div style="opacity:.7; margin-top:12px;">
+                    Nästa fråga laddas…
+                </div>
+            `;
 
-                setTimeout(() => {
-                    clearInterval(interval);
-                    nextQuestion(questionText, answersDiv);
-                }, 2500);
-            }
-        } catch {
-            // tyst
+            setTimeout(() => {
+                nextQuestion(questionText, answersDiv);
+            }, 2500);
         }
-    }, 500);
+    });
 }
 
 // ================== NEXT QUESTION ==================
@@ -359,11 +357,21 @@ async function renderV2Final(roomCode) {
     answersDiv.innerHTML = `<div style="opacity:.7;">Laddar facit…</div>`;
 
     try {
-        const res = await fetch(`/room/${roomCode}`);
-        if (!res.ok) throw new Error();
-
-        const data = await res.json();
-        const results = data.final_results || [];
+        // Facit hämtas sidvis (historiken ingår inte i room-vyerna)
+        const results = [];
+        let total = Infinity;
+
+        while (results.length < total) {
+            const res = await fetch(
+                `/room/${roomCode}/results?offset=${results.length}&limit=100`
+            );
+            if (!res.ok) throw new Error();
+
+            const page = await res.json();
+            total = page.total;
+            if (page.results.length === 0) break;
+            results.push(...page.results);
+        }
 
         // 🧱 FACIT-GRID (scroll + auto-fit)
         answersDiv.style.display = "grid";
@@ -476,15 +484,14 @@ async function renderScoreboard(roomCode) {
     answersDiv.innerHTML = `<div style="opacity:.7;">Laddar scoreboard…</div>`;
 
     try {
-        const res = await fetch(`/room/${roomCode}`);
+        const res = await fetch(`/room/${roomCode}/tv`);
         if (!res.ok) throw new Error();
 
         const data = await res.json();
-        const playersObj = data.players || {};
 
-        const scoreboard = Object.values(playersObj)
-            .map(p => ({ name: p.name, score: p.score || 0 }))
-            .sort((a, b) => b.score - a.score);
+        // Redan sorterad på servern (finns i TV-vyn när phase = scoreboard)
+        const scoreboard = (data.scoreboard || [])
+            .map(p => ({ name: p.name, score: p.score || 0 }));
 
         const winner = scoreboard[0];
         const others = scoreboard.slice(1);
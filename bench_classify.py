@@ -0,0 +1,172 @@
+"""Mikrobenchmark för klassificering och normalisering av frågor.
+
+Jämför de gamla per-text-reglerna (en `in`-skanning per nyckelord, re.sub
+som kompilerar om mönstren) med server.py:s förkompilerade matchare och
+batch-API (classify_questions, normalize_numbers_batch). Kontrollerar
+också att resultaten är identiska.
+
+    python bench_classify.py
+    python bench_classify.py --questions 5000 --rounds 20
+    python bench_classify.py --dump opentdb_dump.json
+
+Ingen server eller nätverk behövs.
+"""
+
+import argparse
+import html
+import random
+import re
+import time
+
+import server
+from import_questions import load_dump, to_raw
+
+# ================== REFERENS (GAMLA REGLERNA) ==================
+
+
+def old_is_media_question(text: str) -> bool:
+    t = text.lower()
+    return any(k in t for k in server.MEDIA_KEYWORDS)
+
+
+def old_is_game_question(text: str) -> bool:
+    t = text.lower()
+    return any(k in t for k in server.GAME_KEYWORDS)
+
+
+def old_normalize_numbers(text: str) -> str:
+    if not text:
+        return text
+
+    replacements = {
+        r"Less than (\d+)\s*Thousand": r"Mindre än \1 000",
+        r"(\d+)\s*Thousand": r"\1 000",
+        r"(\d+)\s*Million": r"\1 miljon",
+    }
+
+    for pattern, repl in replacements.items():
+        text = re.sub(pattern, repl, text, flags=re.IGNORECASE)
+
+    return text
+
+
+def old_classify(texts):
+    return [
+        "game" if old_is_game_question(t) else "media" if old_is_media_question(t) else None
+        for t in texts
+    ]
+
+
+def old_looks_like_name_or_title(text: str) -> bool:
+    words = text.strip().split()
+    if len(words) > 5:
+        return False
+
+    lower = f" {text.lower()} "
+    if any(v in lower for v in server.VERB_HINTS):
+        return False
+
+    caps_ratio = sum(1 for c in text if c.isupper()) / max(len(text), 1)
+    return caps_ratio > 0.3
+
+# ================== DATA ==================
+
+WORDS = (
+    "which country capital river mountain king queen war year first largest "
+    "element planet ocean city author painter language currency animal"
+).split()
+KEYWORDS = server.GAME_KEYWORDS + server.MEDIA_KEYWORDS
+
+
+def synthetic(n: int, seed: int) -> tuple[list[str], list[str]]:
+    rng = random.Random(seed)
+    questions, answers = [], []
+
+    for i in range(n):
+        words = rng.choices(WORDS, k=rng.randint(6, 14))
+        if rng.random() < 0.35:
+            words.insert(rng.randrange(len(words)), rng.choice(KEYWORDS))
+        questions.append(html.unescape(" ".join(words).capitalize() + "?"))
+
+        for _ in range(4):
+            r = rng.random()
+            if r < 0.1:
+                answers.append(f"{rng.randint(1, 999)} Thousand")
+            elif r < 0.15:
+                answers.append(f"Less than {rng.randint(1, 99)} thousand")
+            elif r < 0.2:
+                answers.append(f"{rng.randint(1, 99)} Million")
+            elif r < 0.3:
+                answers.append(f'"{rng.choice(WORDS)}"')
+            else:
+                answers.append(" ".join(rng.choices(WORDS, k=rng.randint(1, 3))).title())
+
+    return questions, answers
+
+
+def from_dump(paths: list[str]) -> tuple[list[str], list[str]]:
+    questions, answers = [], []
+    for path in paths:
+        for q in filter(None, map(to_raw, load_dump(path))):
+            questions.append(html.unescape(q["question"]))
+            answers.extend(html.unescape(a) for a in (q["correct_answer"], *q["incorrect_answers"]))
+    return questions, answers
+
+# ================== KÖRNING ==================
+
+
+def bench(name: str, fn, rounds: int, per: int):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<40} {best * 1000:9.2f} ms   {best / per * 1e6:7.2f} us/text")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark question classification and normalization")
+    parser.add_argument("--questions", type=int, default=2000, help="synthetic questions (4 answers each)")
+    parser.add_argument("--rounds", type=int, default=10, help="best of N rounds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--dump", nargs="*", default=[], help="benchmark on question dumps instead")
+    args = parser.parse_args()
+
+    questions, answers = from_dump(args.dump) if args.dump else synthetic(args.questions, args.seed)
+    print(f"{len(questions)} questions, {len(answers)} answers, best of {args.rounds}\n")
+
+    # Samma svar som förut – annars är siffrorna meningslösa
+    expected = old_classify(questions)
+    assert [
+        "game" if server.is_game_question(t) else "media" if server.is_media_question(t) else None
+        for t in questions
+    ] == expected, "is_game_question/is_media_question differ"
+    assert [server.classify_question(t) for t in questions] == expected, "classify_question differs"
+    assert server.classify_questions(questions) == expected, "batch classification differs"
+    expected = [old_normalize_numbers(a) for a in answers]
+    assert [server.normalize_numbers(a) for a in answers] == expected, "normalize_numbers differs"
+    assert server.normalize_numbers_batch(answers) == expected, "normalize_numbers_batch differs"
+    texts = questions + answers
+    assert [server.looks_like_name_or_title(t) for t in texts] == [old_looks_like_name_or_title(t) for t in texts], \
+        "looks_like_name_or_title differs"
+
+    print("classification")
+    old = bench("  old (in-scan per keyword)", lambda: old_classify(questions), args.rounds, len(questions))
+    new = bench("  classify_questions (one trie regex)", lambda: server.classify_questions(questions), args.rounds, len(questions))
+    print(f"  speedup {old / new:.1f}x\n")
+
+    print("number normalization")
+    old = bench("  old (re.sub per text)", lambda: [old_normalize_numbers(a) for a in answers], args.rounds, len(answers))
+    bench("  precompiled, per text", lambda: [server.normalize_numbers(a) for a in answers], args.rounds, len(answers))
+    new = bench("  normalize_numbers_batch", lambda: server.normalize_numbers_batch(answers), args.rounds, len(answers))
+    print(f"  speedup {old / new:.1f}x\n")
+
+    print("name/title detection")
+    old = bench("  old (in-scan per verb)", lambda: [old_looks_like_name_or_title(a) for a in answers], args.rounds, len(answers))
+    new = bench("  looks_like_name_or_title", lambda: [server.looks_like_name_or_title(a) for a in answers], args.rounds, len(answers))
+    print(f"  speedup {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
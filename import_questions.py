@@ -0,0 +1,152 @@
+"""Importerar en frågedump till FestQuiz frågebank (QUESTION_BANK_DB).
+
+Läser JSON eller JSON Lines i något av formaten
+  - OpenTDB:        {"results": [...]} eller en lista med samma objekt
+  - the-trivia-api: [{"question", "correctAnswer", "incorrectAnswers", ...}]
+  - FestQuiz:       [{"question", "correct_answer", "incorrect_answers"}]
+och kör frågorna genom samma översättning och normalisering som /quiz
+(DeepL + översättningscachen) innan de läggs i banken. Kategori och
+svårighet tas från varje fråga (OpenTDB-namn mappas till id) om de inte
+anges på kommandoraden.
+
+    python import_questions.py opentdb_dump.json
+    python import_questions.py film.jsonl --category 11 --difficulty easy
+    python import_questions.py export.json --translated
+
+Samma miljövariabler som servern (FESTQUIZ_DATA_DIR, QUESTION_BANK_DB,
+TRANSLATION_CACHE_DB, DEEPL_API_KEY).
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+import server
+
+CHUNK = 50  # frågor per översättningsomgång
+
+# OpenTDB:s kategorinamn → id (det som /quiz?category= använder)
+OPENTDB_CATEGORIES = {
+    "General Knowledge": "9",
+    "Entertainment: Books": "10",
+    "Entertainment: Film": "11",
+    "Entertainment: Music": "12",
+    "Entertainment: Musicals & Theatres": "13",
+    "Entertainment: Television": "14",
+    "Entertainment: Video Games": "15",
+    "Entertainment: Board Games": "16",
+    "Science & Nature": "17",
+    "Science: Computers": "18",
+    "Science: Mathematics": "19",
+    "Mythology": "20",
+    "Sports": "21",
+    "Geography": "22",
+    "History": "23",
+    "Politics": "24",
+    "Art": "25",
+    "Celebrities": "26",
+    "Animals": "27",
+    "Vehicles": "28",
+    "Entertainment: Comics": "29",
+    "Science: Gadgets": "30",
+    "Entertainment: Japanese Anime & Manga": "31",
+    "Entertainment: Cartoon & Animations": "32",
+    # the-trivia-api
+    "general_knowledge": "9",
+    "film_and_tv": "11",
+    "music": "12",
+    "sport_and_leisure": "21",
+    "geography": "22",
+    "history": "23",
+    "science": "17",
+}
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+
+def load_dump(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+    return data.get("results", []) if isinstance(data, dict) else data
+
+
+def to_raw(item: dict) -> dict | None:
+    """Normaliserar ett dump-objekt till OpenTDB-form; None om det inte går att spela."""
+    question = item.get("question")
+    if isinstance(question, dict):  # the-trivia-api v2: {"text": ...}
+        question = question.get("text")
+
+    correct = item.get("correct_answer", item.get("correctAnswer"))
+    incorrect = item.get("incorrect_answers", item.get("incorrectAnswers"))
+
+    # Spelet visar alltid fyra alternativ (A–D)
+    if not question or not correct or not isinstance(incorrect, list) or len(incorrect) != 3:
+        return None
+
+    return {
+        "question": question,
+        "correct_answer": correct,
+        "incorrect_answers": incorrect,
+        "category": OPENTDB_CATEGORIES.get(item.get("category", ""), ""),
+        "difficulty": item.get("difficulty") if item.get("difficulty") in DIFFICULTIES else ""
+    }
+
+
+async def run(args) -> int:
+    raw = []
+    for path in args.files:
+        items = load_dump(path)
+        parsed = [q for q in map(to_raw, items) if q is not None]
+        print(f"{path}: {len(parsed)} of {len(items)} questions usable")
+        raw.extend(parsed)
+
+    # Gruppera per (kategori, svårighet) så banken får rätt nycklar
+    groups: dict[tuple[str, str], list[dict]] = {}
+    for q in raw:
+        key = (
+            q["category"] if args.category is None else args.category,
+            q["difficulty"] if args.difficulty is None else args.difficulty
+        )
+        groups.setdefault(key, []).append(q)
+
+    server.TRANSLATION_CACHE.open()
+    server.QUESTION_BANK.open()
+    added = 0
+
+    try:
+        for (category, difficulty), questions in sorted(groups.items()):
+            for i in range(0, len(questions), CHUNK):
+                chunk = questions[i:i + CHUNK]
+                if not args.translated:
+                    chunk = await server.prepare_questions(chunk)
+                added += server.QUESTION_BANK.add_many(chunk, category, difficulty)
+            print(f"category={category or '-'} difficulty={difficulty or '-'}: {len(questions)} questions")
+    finally:
+        for upstream in server.UPSTREAMS:
+            await upstream.close()
+        server.TRANSLATION_CACHE.close()
+        server.QUESTION_BANK.close()
+
+    print(f"added {added} new questions ({len(raw) - added} already in the bank) to {server.QUESTION_BANK_DB}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a question dump into the FestQuiz question bank")
+    parser.add_argument("files", nargs="+", help="JSON or JSON Lines dumps")
+    parser.add_argument("--category", help="OpenTDB category id for every question (default: from the dump)")
+    parser.add_argument("--difficulty", choices=DIFFICULTIES, help="difficulty for every question (default: from the dump)")
+    parser.add_argument("--translated", action="store_true", help="questions are already in Swedish; skip DeepL")
+    args = parser.parse_args()
+
+    if not args.translated and not server.DEEPL_KEY:
+        parser.error("DEEPL_API_KEY is not set (use --translated for dumps that are already in Swedish)")
+
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+// ================== LIVE ROOM STATE (WEBSOCKET + POLL-FALLBACK) ==================
+// watchRoom(roomCode, role, onRoom, { playerId }) anropar onRoom(data, event)
+// varje gång room-state ändras, med rollens vy (tv | host | player).
+// Servern pushar via /ws/room/{room}; när socketen är nere används
+// long-poll mot /room/{room}/{roll}?since=<version>&wait=<s>.
+
+(function () {
+    const POLL_MS = 2000;
+    const LONG_POLL_S = 25;
+    const RECONNECT_MS = 3000;
+    const PING_MS = 25000;
+    const ROOM_GONE = 4404; // servern stänger socketen så när rummet inte finns
+
+    function watchRoom(roomCode, role, onRoom, options = {}) {
+        const pollMs = options.pollMs || POLL_MS;
+        const code = encodeURIComponent(roomCode);
+        const playerId = options.playerId || null;
+
+        const viewPath = role === "player"
+            ? `/room/${code}/player` + (playerId ? `/${encodeURIComponent(playerId)}` : "")
+            : `/room/${code}/${role}`;
+
+        let socket = null;
+        let polling = false;
+        let pollRun = 0;
+        let pingTimer = null;
+        let stopped = false;
+        let version = null;
+
+        function deliver(data, event) {
+            if (typeof data.version === "number") {
+                if (data.version === version && event === "poll") return;
+                version = data.version;
+            }
+            onRoom(data, event);
+        }
+
+        async function refresh() {
+            try {
+                const res = await fetch(viewPath);
+                if (!res.ok) return;
+                deliver(await res.json(), "poll");
+            } catch {
+                // tyst
+            }
+        }
+
+        const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+        // Rummet finns inte (fel kod eller rensat) – sluta både ansluta och polla
+        function gone() {
+            stopped = true;
+            stopPolling();
+            clearInterval(pingTimer);
+        }
+
+        async function longPoll(run) {
+            const active = () => polling && !stopped && run === pollRun;
+
+            while (active()) {
+                const url = version === null
+                    ? viewPath
+                    : `${viewPath}?since=${version}&wait=${LONG_POLL_S}`;
+
+                try {
+                    const res = await fetch(url);
+                    if (res.status === 404) {
+                        gone();
+                        return;
+                    }
+                    if (!res.ok) {
+                        await sleep(pollMs);
+                        continue;
+                    }
+                    const data = await res.json();
+                    if (active()) deliver(data, "poll");
+                } catch {
+                    await sleep(pollMs);
+                }
+            }
+        }
+
+        function startPolling() {
+            if (polling || stopped) return;
+            polling = true;
+            longPoll(++pollRun);
+        }
+
+        function stopPolling() {
+            polling = false;
+        }
+
+        function connect() {
+            if (stopped) return;
+
+            const wsUrl =
+                (location.protocol === "https:" ? "wss://" : "ws://") +
+                location.host +
+                `/ws/room/${code}?role=${encodeURIComponent(role)}` +
+                (playerId ? `&player_id=${encodeURIComponent(playerId)}` : "");
+
+            try {
+                socket = new WebSocket(wsUrl);
+            } catch {
+                startPolling();
+                setTimeout(connect, RECONNECT_MS);
+                return;
+            }
+
+            socket.onopen = () => {
+                stopPolling();
+                pingTimer = setInterval(() => {
+                    if (socket && socket.readyState === WebSocket.OPEN) socket.send("ping");
+                }, PING_MS);
+            };
+
+            socket.onmessage = (event) => {
+                try {
+                    const msg = JSON.parse(event.data);
+                    if (msg.type === "room" && msg.room) deliver(msg.room, msg.event);
+                } catch {
+                    // tyst
+                }
+            };
+
+            socket.onclose = (event) => {
+                clearInterval(pingTimer);
+                socket = null;
+                if (event.code === ROOM_GONE) gone();
+                if (stopped) return;
+                startPolling();
+                setTimeout(connect, RECONNECT_MS);
+            };
+        }
+
+        connect();
+
+        return {
+            refresh,
+            stop() {
+                stopped = true;
+                stopPolling();
+                clearInterval(pingTimer);
+                if (socket) socket.close();
+            }
+        };
+    }
+
+    window.watchRoom = watchRoom;
+})();
@@ -0,0 +1,492 @@
+"""Lasttest för FestQuiz – simulerade partykvällar helt offline.
+
+Startar server.py (uvicorn, egen process) mot lokala stubbar för OpenTDB,
+the-trivia-api och DeepL och kör många rum parallellt. Varje rum har en
+TV, en host och N mobiler som följer samma flöde som start.html/app.js,
+host.html och join.html: long-poll (eller WebSocket med --ws) på sin vy,
+join, start, frågor med timer, svar (ibland byte av svar), scoreboard och
+sidat facit.
+
+    python loadtest.py --rooms 20 --players 12 --questions 3
+    python loadtest.py --rooms 50 --players 30 --waves 3 --workers 2 --store sqlite
+
+Rapporterar genomströmning, p50/p95/p99 per endpoint och serverns minne
+(RSS) före, under och efter varje våg – växer minnet mellan vågor läcker
+något. Long-polls redovisas separat: deras tid är mest väntan.
+"""
+
+import argparse
+import asyncio
+import html
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LONG_POLL_S = 25      # samma som live.js
+RESULT_PAUSE_S = 2.5  # app.js visar rätt/fel så här länge före nästa fråga
+SECONDS = {"easy": 25, "medium": 20, "hard": 15}
+
+# ================== STUB-UPSTREAMS ==================
+
+
+def stub_question(i: int) -> dict:
+    n = random.randrange(10 ** 9)
+    return {
+        "category": "General Knowledge",
+        "type": "multiple",
+        "difficulty": "medium",
+        "question": html.escape(f"Which answer is right in stub question {n}-{i}?"),
+        "correct_answer": f"Right {n}",
+        "incorrect_answers": [f"Wrong {n}-{k}" for k in range(3)]
+    }
+
+
+def make_stub_app(latency: float) -> FastAPI:
+    stub = FastAPI()
+    stub.state.calls = defaultdict(int)
+
+    async def delay(name: str):
+        stub.state.calls[name] += 1
+        if latency:
+            await asyncio.sleep(latency * random.uniform(0.5, 1.5))
+
+    @stub.get("/opentdb/api.php")
+    async def opentdb(amount: int = 10):
+        await delay("opentdb")
+        return {"response_code": 0, "results": [stub_question(i) for i in range(min(amount, 50))]}
+
+    @stub.get("/opentdb/api_token.php")
+    async def opentdb_token(command: str = "request", token: str = ""):
+        await delay("opentdb_token")
+        return {"response_code": 0, "token": token or f"stub-{random.randrange(10 ** 9)}"}
+
+    @stub.get("/trivia/api/questions")
+    async def trivia(limit: int = 10):
+        await delay("trivia_api")
+        return [
+            {
+                "question": q["question"],
+                "correctAnswer": q["correct_answer"],
+                "incorrectAnswers": q["incorrect_answers"]
+            }
+            for q in (stub_question(i) for i in range(limit))
+        ]
+
+    @stub.post("/deepl/v2/translate")
+    async def deepl(request: Request):
+        await delay("deepl")
+        texts = parse_qs((await request.body()).decode("utf-8")).get("text", [])
+        return {"translations": [{"text": f"SV {t}"} for t in texts]}
+
+    return stub
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stubs(latency: float):
+    port = free_port()
+    app = make_stub_app(latency)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, app, f"http://127.0.0.1:{port}"
+
+# ================== SERVER-PROCESS ==================
+
+
+def start_server(args, stub_url: str, port: int, data_dir: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        OPENTDB_URL=f"{stub_url}/opentdb/api.php",
+        TRIVIA_API_URL=f"{stub_url}/trivia/api/questions",
+        DEEPL_URL=f"{stub_url}/deepl/v2/translate",
+        DEEPL_API_KEY="stub",
+        OPENTDB_INTERVAL="0",  # stubben har ingen rate limit
+        FESTQUIZ_DATA_DIR=data_dir,
+        ROOM_STORE=args.store,
+        ROOM_MAX=str(max(args.rooms * 4, 100))
+    )
+    cmd = [
+        sys.executable, "-m", "uvicorn", "server:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--log-level", "warning", "--workers", str(args.workers)
+    ]
+    return subprocess.Popen(cmd, cwd=BASE_DIR, env=env)
+
+
+def process_tree(pid: int) -> list[int]:
+    children = defaultdict(list)
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children[ppid].append(int(entry))
+
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children[current])
+    return tree
+
+
+def rss_mb(pid: int):
+    # Linux: summera VmRSS för servern och dess workers
+    if not os.path.isdir("/proc"):
+        return None
+    total = 0
+    for p in process_tree(pid):
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+    return total / 1024
+
+
+async def wait_ready(base: str, proc: subprocess.Popen):
+    async with httpx.AsyncClient() as client:
+        for _ in range(200):
+            if proc.poll() is not None:
+                raise SystemExit("server.py exited during startup")
+            try:
+                await client.get(f"{base}/room/READY/tv")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise SystemExit("server.py did not start")
+
+# ================== MÄTNING ==================
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.pushes = 0
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append(time.perf_counter() - start)
+        if response.status_code >= 500:
+            self.errors[label] += 1
+        return response
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def report(stats: Stats, elapsed: float, memory: list[tuple[str, float]], games: int, failures: list[str]):
+    print()
+    print(f"{'endpoint':<34}{'count':>8}{'err':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    total = 0
+    for label in sorted(stats.latencies):
+        values = sorted(stats.latencies[label])
+        total += len(values)
+        print(
+            f"{label:<34}{len(values):>8}{stats.errors[label]:>6}{len(values) / elapsed:>9.1f}"
+            f"{percentile(values, 50) * 1000:>9.1f}{percentile(values, 95) * 1000:>9.1f}"
+            f"{percentile(values, 99) * 1000:>9.1f}{values[-1] * 1000:>9.1f}"
+        )
+    print(f"\n{total} requests in {elapsed:.1f} s ({total / elapsed:.1f} req/s), "
+          f"{stats.pushes} WebSocket pushes, {games} games completed")
+
+    if memory:
+        print("server RSS: " + ", ".join(f"{name} {mb:.1f} MB" for name, mb in memory))
+        print(f"growth: {memory[-1][1] - memory[0][1]:+.1f} MB")
+
+    for failure in failures[:10]:
+        print(f"FAIL {failure}")
+
+# ================== SIMULERADE KLIENTER ==================
+
+
+async def follow_poll(client, stats, base, path, on_view):
+    # Som live.js utan socket: full vy först, sedan long-poll på version
+    version = None
+    while True:
+        if version is None:
+            response = await stats.request(client, "GET view", "GET", f"{base}{path}")
+        else:
+            response = await stats.request(
+                client, "GET view (long-poll)", "GET",
+                f"{base}{path}?since={version}&wait={LONG_POLL_S}",
+                timeout=LONG_POLL_S + 10
+            )
+        if response is None or response.status_code != 200:
+            await asyncio.sleep(2)
+            continue
+        data = response.json()
+        version = data.get("version")
+        on_view(data)
+
+
+async def follow_ws(stats, base, code, role, player_id, on_view):
+    import websockets
+
+    url = base.replace("http://", "ws://") + f"/ws/room/{code}?role={role}"
+    if player_id:
+        url += f"&player_id={player_id}"
+
+    async with websockets.connect(url, max_size=None) as ws:
+        async for raw in ws:
+            msg = json.loads(raw)
+            if msg.get("type") == "room" and msg.get("room"):
+                stats.pushes += 1
+                on_view(msg["room"])
+
+
+def follow(args, client, stats, base, code, role, on_view, player_id=None):
+    if args.ws:
+        coro = follow_ws(stats, base, code, role, player_id, on_view)
+    else:
+        path = f"/room/{code}/{role}" + (f"/{player_id}" if player_id else "")
+        coro = follow_poll(client, stats, base, path, on_view)
+    return asyncio.create_task(coro)
+
+
+class Phone:
+    def __init__(self, name: str):
+        self.name = name
+        self.player_id = None
+        self.answered = set()
+
+    def on_view(self, args, client, stats, base, code, data):
+        # join.html: ny fråga → användaren trycker efter en stund
+        qid = data.get("question_id")
+        if data.get("phase") == "question" and qid and qid not in self.answered:
+            self.answered.add(qid)
+            asyncio.create_task(self.answer(args, client, stats, base, code))
+
+    async def answer(self, args, client, stats, base, code):
+        await asyncio.sleep(random.uniform(0.3, min(args.think, SECONDS[args.difficulty] - 1)))
+        url = f"{base}/room/answer?room={code}&player_id={self.player_id}"
+        await stats.request(client, "POST /room/answer", "POST", f"{url}&answer={random.choice('ABCD')}")
+        if random.random() < args.change:
+            await asyncio.sleep(random.uniform(0.2, 1.5))
+            await stats.request(client, "POST /room/answer", "POST", f"{url}&answer={random.choice('ABCD')}")
+
+
+async def play_room(args, client, stats, base, index: int, failures: list[str]) -> bool:
+    tasks = []
+    try:
+        # TV: / skapar rum och låser URL:en, sedan sidan + QR-koderna
+        response = await stats.request(client, "GET /", "GET", f"{base}/")
+        code = response.headers["location"].split("room=")[1]
+        await stats.request(client, "GET /?room=", "GET", f"{base}/?room={code}")
+        await asyncio.gather(
+            stats.request(client, "GET /qr/*.svg", "GET", f"{base}/qr/{code}/player.svg"),
+            stats.request(client, "GET /qr/*.svg", "GET", f"{base}/qr/{code}/host.svg")
+        )
+
+        tv_state = {}
+        tv_changed = asyncio.Event()
+
+        def on_tv(data):
+            tv_state.update(data)
+            tv_changed.set()
+
+        tasks.append(follow(args, client, stats, base, code, "tv", on_tv))
+        tasks.append(follow(args, client, stats, base, code, "host", lambda data: None))
+        await stats.request(client, "POST /room/host_ready", "POST", f"{base}/room/host_ready?room={code}", json={})
+
+        # Mobiler ansluter utspritt under en sekund
+        phones = [Phone(f"p{index}-{i}") for i in range(args.players)]
+
+        async def join(phone: Phone):
+            await asyncio.sleep(random.uniform(0, 1))
+            tasks.append(follow(args, client, stats, base, code, "player", lambda data: None))
+            response = await stats.request(
+                client, "POST /room/join", "POST", f"{base}/room/join?room={code}&name={phone.name}"
+            )
+            phone.player_id = response.json()["playerId"]
+            tasks[-1].cancel()
+            tasks.append(follow(
+                args, client, stats, base, code, "player",
+                lambda data, phone=phone: phone.on_view(args, client, stats, base, code, data),
+                player_id=phone.player_id
+            ))
+
+        await asyncio.gather(*(join(phone) for phone in phones))
+        await stats.request(client, "POST /room/start", "POST", f"{base}/room/start?room={code}", json={})
+
+        questions = []
+        for _ in range(20):
+            response = await stats.request(
+                client, "GET /quiz", "GET",
+                f"{base}/quiz?amount={args.questions}&category=&difficulty=&room={code}"
+            )
+            questions = response.json() if response is not None and response.status_code == 200 else []
+            if questions:
+                break
+            await asyncio.sleep(0.5)
+        if not questions:
+            failures.append(f"{code}: /quiz returned no questions")
+            return False
+
+        for n, q in enumerate(questions, 1):
+            answers = [q["correct_answer"], *q["incorrect_answers"]]
+            random.shuffle(answers)
+            qid = f"{n}/{len(questions)}"
+            await stats.request(client, "POST /room/question", "POST", f"{base}/room/question?room={code}", json={
+                "id": qid,
+                "question": q["question"],
+                "difficulty": args.difficulty,
+                "options": dict(zip("ABCD", answers)),
+                "correct_letter": "ABCD"[answers.index(q["correct_answer"])]
+            })
+
+            # app.js: vänta på serverns lås (push), visa resultat, nästa fråga
+            deadline = time.time() + SECONDS[args.difficulty] + 10
+            while not (
+                tv_state.get("phase") == "locked"
+                and (tv_state.get("current_question") or {}).get("id") == qid
+            ):
+                tv_changed.clear()
+                try:
+                    await asyncio.wait_for(tv_changed.wait(), max(0.1, deadline - time.time()))
+                except asyncio.TimeoutError:
+                    failures.append(f"{code}: question {qid} never locked")
+                    return False
+
+            result = tv_state.get("last_result") or {}
+            if result.get("right", 0) + result.get("wrong", 0) != args.players:
+                failures.append(f"{code}: result {result} does not add up to {args.players} players")
+            await asyncio.sleep(RESULT_PAUSE_S)
+
+        await stats.request(client, "POST /room/scoreboard", "POST", f"{base}/room/scoreboard?room={code}")
+        await stats.request(client, "GET /room/{code}/tv", "GET", f"{base}/room/{code}/tv")
+
+        offset, total = 0, None
+        while total is None or offset < total:
+            response = await stats.request(
+                client, "GET /room/{code}/results", "GET",
+                f"{base}/room/{code}/results?offset={offset}&limit=100"
+            )
+            page = response.json()
+            total = page["total"]
+            if not page["results"]:
+                break
+            offset += len(page["results"])
+        return True
+
+    except Exception as e:
+        failures.append(f"room {index}: {e!r}")
+        return False
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+# ================== KÖRNING ==================
+
+
+async def run(args):
+    stub_server, stub_app, stub_url = start_stubs(args.upstream_latency)
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    data_dir = tempfile.mkdtemp(prefix="festquiz-loadtest-")
+    proc = start_server(args, stub_url, port, data_dir)
+
+    stats = Stats()
+    memory = []
+    failures = []
+    games = 0
+
+    try:
+        await wait_ready(base, proc)
+        await asyncio.sleep(1)  # låt frågepoolen värmas mot stubbarna
+        memory.append(("start", rss_mb(proc.pid)))
+
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+            started = time.perf_counter()
+            for wave in range(1, args.waves + 1):
+                print(f"wave {wave}/{args.waves}: {args.rooms} rooms × {args.players} players …", flush=True)
+                peak = 0.0
+
+                async def sample():
+                    nonlocal peak
+                    while True:
+                        peak = max(peak, rss_mb(proc.pid) or 0)
+                        await asyncio.sleep(1)
+
+                sampler = asyncio.create_task(sample())
+                outcomes = await asyncio.gather(*(
+                    play_room(args, client, stats, base, i, failures)
+                    for i in range(args.rooms)
+                ))
+                sampler.cancel()
+                games += sum(outcomes)
+                memory.append((f"wave {wave} peak", peak))
+                memory.append((f"after wave {wave}", rss_mb(proc.pid)))
+            elapsed = time.perf_counter() - started
+
+        memory = [(name, mb) for name, mb in memory if mb is not None]
+        report(stats, elapsed, memory, games, failures)
+        print("upstream calls: " + ", ".join(f"{k}={v}" for k, v in sorted(stub_app.state.calls.items())))
+    finally:
+        proc.terminate()
+        proc.wait()
+        stub_server.should_exit = True
+
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FestQuiz load test (offline, stubbed upstreams)")
+    parser.add_argument("--rooms", type=int, default=10, help="concurrent rooms per wave")
+    parser.add_argument("--players", type=int, default=8, help="phones per room")
+    parser.add_argument("--questions", type=int, default=3, help="questions per game")
+    parser.add_argument("--waves", type=int, default=1, help="repeat the party N times (memory growth)")
+    parser.add_argument("--difficulty", choices=sorted(SECONDS), default="hard", help="sets the question timer")
+    parser.add_argument("--think", type=float, default=6.0, help="max seconds before a phone answers")
+    parser.add_argument("--change", type=float, default=0.2, help="probability a phone changes its answer")
+    parser.add_argument("--ws", action="store_true", help="follow rooms over WebSocket (needs `websockets`)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (use --store sqlite for >1)")
+    parser.add_argument("--store", choices=["memory", "sqlite"], default="memory", help="ROOM_STORE backend")
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="stub upstream latency in seconds")
+    args = parser.parse_args()
+
+    if args.workers > 1 and args.store == "memory":
+        parser.error("--workers > 1 needs --store sqlite")
+
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,6 @@ from fastapi.responses import FileResponse, RedirectResponse, Response  # + Resp
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-import requests
 import os
 import html
 import re
@@ -14,9 +13,109 @@ import qrcode
 from io import BytesIO
 # 🔼 NYTT
 
-DEDUP_MAX = 300  # justerbart 200–300
-seen_questions = deque(maxlen=DEDUP_MAX)  # FIFO
-seen_by_category = defaultdict(deque)     # per kategori, FIFO
+import json
+from collections import OrderedDict
+
+DATA_DIR = os.getenv(
+    "FESTQUIZ_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data")
+)
+
+# ================== DEDUP-INDEX ==================
+
+DEDUP_CATEGORY_MAX = int(os.getenv("DEDUP_CATEGORY_MAX", "300"))  # per kategori
+DEDUP_ROOM_MAX = int(os.getenv("DEDUP_ROOM_MAX", "500"))          # per room
+# Tom sträng = ingen persistens
+DEDUP_STATE_FILE = os.getenv("DEDUP_STATE_FILE", os.path.join(DATA_DIR, "dedup.json"))
+
+
+class SeenSet:
+    """Mängd med FIFO-utträngning: O(1) uppslag, insättning och eviction."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.items: OrderedDict[str, None] = OrderedDict()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, key: str):
+        if key in self.items:
+            return
+        self.items[key] = None
+        if len(self.items) > self.capacity:
+            self.items.popitem(last=False)
+
+
+class DedupIndex:
+    """Sedda fråge-hashar per scope ("category:9", "room:ABCD").
+
+    Kategori-scopes används när poolen fylls på, room-scopes när frågor
+    delas ut – ett rum får aldrig samma fråga två gånger, utan att andra
+    rum svälts. Kategori-scopes kan sparas mellan omstarter.
+    """
+
+    def __init__(self, capacities: dict[str, int]):
+        self.capacities = capacities
+        self.scopes: dict[str, SeenSet] = {}
+        self.skipped: dict[str, int] = defaultdict(int)  # träffar per scope-typ
+
+    def scope(self, name: str) -> SeenSet:
+        seen = self.scopes.get(name)
+        if seen is None:
+            kind = name.split(":", 1)[0]
+            seen = SeenSet(self.capacities.get(kind, DEDUP_CATEGORY_MAX))
+            self.scopes[name] = seen
+        return seen
+
+    def seen(self, key: str, *scopes: str) -> bool:
+        for s in scopes:
+            if s in self.scopes and key in self.scopes[s]:
+                self.skipped[s.split(":", 1)[0]] += 1
+                return True
+        return False
+
+    def add(self, key: str, *scopes: str):
+        for s in scopes:
+            self.scope(s).add(key)
+
+    def drop(self, name: str):
+        self.scopes.pop(name, None)
+
+    def load(self, path: str):
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[DEDUP] could not load {path}: {e!r}")
+            return
+        for name, keys in state.items():
+            seen = self.scope(name)
+            for key in keys:
+                seen.add(key)
+
+    def save(self, path: str, kinds=("category",)):
+        if not path:
+            return
+        state = {
+            name: list(seen.items)
+            for name, seen in self.scopes.items()
+            if name.split(":", 1)[0] in kinds
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"  # flera workers kan spara samtidigt
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+
+QUESTION_INDEX = DedupIndex({"category": DEDUP_CATEGORY_MAX, "room": DEDUP_ROOM_MAX})
+
 
 def question_hash(question_text: str, options: dict) -> str:
     payload = question_text.strip() + "|" + "|".join(
@@ -24,9 +123,304 @@ def question_hash(question_text: str, options: dict) -> str:
     )
     return hashlib.sha1(payload.encode("utf-8")).hexdigest()
 
+
+def question_key(q: dict) -> str:
+    return question_hash(q["question"], {
+        "correct": q["correct_answer"],
+        **{f"i{i}": v for i, v in enumerate(q["incorrect_answers"])}
+    })
+
+# ================== JSON (SNABB SERIALISERING) ==================
+# orjson om det finns installerat, annars kompakt stdlib-json. Används som
+# standard-response för hela API:t och för färdigkodade room-vyer.
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_bytes(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return json_bytes(content)
+
+# ================== METRICS (PROMETHEUS) ==================
+# /metrics i Prometheus text-format. Latens (HTTP, upstream, event-loop)
+# mäts med histogram här; räknare som redan finns i cacherna, rummen och
+# dedup-indexet läses av först vid scrape. FESTQUIZ_PROFILE=1 slår även
+# på /debug/profile och /debug/memory.
+
+import bisect
+import math
+import threading
+import time
+
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+LOOP_LAG_INTERVAL = 0.5
+FESTQUIZ_PROFILE = os.getenv("FESTQUIZ_PROFILE") == "1"
+
+
+def escape_label(value) -> str:
+    # Prometheus textformat: \\, \" och \n i labelvärden
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def metric_name(name: str, names=(), values=()) -> str:
+    if not names:
+        return name
+    pairs = ",".join(f'{n}="{escape_label(v)}"' for n, v in zip(names, values))
+    return f"{name}{{{pairs}}}"
+
+
+def metric_value(value) -> str:
+    # Full precision – :g tappar siffror efter sex och fryser stora räknare
+    if isinstance(value, int):
+        return str(int(value))
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return "NaN" if math.isnan(value) else repr(value)
+
+
+def metric_lines(name: str, kind: str, help: str, samples) -> list[str]:
+    # samples: [(suffix, labelnamn, labelvärden, värde)]
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for suffix, names, values, value in samples:
+        lines.append(f"{metric_name(name + suffix, names, values)} {metric_value(value)}")
+    return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: dict[tuple, float] = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self.lock:
+            self.values[labels] += amount
+
+    def render(self) -> list[str]:
+        with self.lock:
+            items = sorted(self.values.items())
+        return metric_lines(self.name, "counter", self.help, [
+            ("", self.labels, labels, value) for labels, value in items
+        ])
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels=(), buckets=METRICS_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.counts: dict[tuple, list[int]] = {}
+        self.sums: dict[tuple, float] = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.counts.get(labels)
+            if counts is None:
+                counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+            counts[i] += 1
+            self.sums[labels] += value
+
+    def render(self) -> list[str]:
+        with self.lock:
+            items = sorted((labels, list(counts), self.sums[labels]) for labels, counts in self.counts.items())
+
+        samples = []
+        names = self.labels + ("le",)
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                samples.append(("_bucket", names, labels + (le,), cumulative))
+            samples.append(("_sum", self.labels, labels, total))
+            samples.append(("_count", self.labels, labels, cumulative))
+        return metric_lines(self.name, "histogram", self.help, samples)
+
+
+class Metrics:
+    def __init__(self):
+        self.instruments = []
+        self.collectors = []
+
+    def counter(self, name: str, help: str, labels=()) -> Counter:
+        counter = Counter(name, help, labels)
+        self.instruments.append(counter)
+        return counter
+
+    def histogram(self, name: str, help: str, labels=(), buckets=METRICS_BUCKETS) -> Histogram:
+        histogram = Histogram(name, help, labels, buckets)
+        self.instruments.append(histogram)
+        return histogram
+
+    def collector(self, fn):
+        # fn() -> rader; körs vid varje scrape
+        self.collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for instrument in self.instruments:
+            lines.extend(instrument.render())
+        for fn in self.collectors:
+            lines.extend(fn())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+HTTP_LATENCY = METRICS.histogram(
+    "festquiz_http_request_duration_seconds",
+    "HTTP request latency per route (kind=longpoll includes waiting)",
+    ("method", "route", "kind")
+)
+HTTP_REQUESTS = METRICS.counter(
+    "festquiz_http_requests_total",
+    "HTTP requests per route and status",
+    ("method", "route", "status")
+)
+UPSTREAM_LATENCY = METRICS.histogram(
+    "festquiz_upstream_request_duration_seconds",
+    "Upstream call latency including retries",
+    ("upstream",)
+)
+UPSTREAM_RESULTS = METRICS.counter(
+    "festquiz_upstream_requests_total",
+    "Upstream calls per result (ok, error, circuit_open)",
+    ("upstream", "result")
+)
+LOOP_LAG = METRICS.histogram(
+    "festquiz_event_loop_lag_seconds",
+    "How late the event loop wakes up a sleeping task",
+    buckets=LOOP_LAG_BUCKETS
+)
+OPENTDB_RESPONSES = METRICS.counter(
+    "festquiz_opentdb_responses_total",
+    "OpenTDB response_code per call (0 ok, 1 no results, 3/4 token, 5 rate limit)",
+    ("code",)
+)
+QUIZ_QUESTIONS = METRICS.counter(
+    "festquiz_fetch_questions_total",
+    "Questions seen by fetch_questions (fetched, dedup_skipped, returned)",
+    ("result",)
+)
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: latens och status per route-mall (inte per URL)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            # Routern lägger matchad route i scope – /room/{code}/tv, inte /room/ABCD/tv
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            query = scope.get("query_string", b"")
+            kind = "longpoll" if b"since=" in query and b"wait=" in query else "request"
+            HTTP_LATENCY.observe(time.perf_counter() - start, scope["method"], route, kind)
+            HTTP_REQUESTS.inc(scope["method"], route, str(status))
+
+
+class LoopLagMonitor:
+    """Sover LOOP_LAG_INTERVAL åt gången och mäter hur sent den väcks."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.last = 0.0
+        self.task = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.last = max(0.0, loop.time() - start - self.interval)
+            LOOP_LAG.observe(self.last)
+
+    async def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        self.task = None
+
+
+LOOP_LAG_MONITOR = LoopLagMonitor(LOOP_LAG_INTERVAL)
+
 # ================== APP & CACHE ==================
 
-app = FastAPI()
+from contextlib import asynccontextmanager
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Bakgrundsjobb lever lika länge som processen
+    await LOOP_LAG_MONITOR.start()
+    await asyncio.to_thread(ROOM_STORE.open)
+    await ROOM_HUB.start()
+    await asyncio.to_thread(TRANSLATION_CACHE.open)
+    await asyncio.to_thread(QUESTION_BANK.open)
+    await asyncio.to_thread(QUESTION_INDEX.load, DEDUP_STATE_FILE)
+    await ROOM_TIMERS.start()
+    await asyncio.to_thread(ROOM_TIMERS.resume)
+    await asyncio.to_thread(ROOM_LIFECYCLE.resume)
+    await ROOM_LIFECYCLE.start()
+    QUESTION_POOL.warm(POOL_WARM_KEYS)
+    try:
+        yield
+    finally:
+        await QUESTION_POOL.stop()
+        await ROOM_LIFECYCLE.stop()
+        await ROOM_TIMERS.stop()
+        await ROOM_HUB.stop()
+        for upstream in UPSTREAMS:
+            await upstream.close()
+        QUESTION_INDEX.save(DEDUP_STATE_FILE)
+        TRANSLATION_CACHE.close()
+        QUESTION_BANK.close()
+        ROOM_STORE.close()
+        await LOOP_LAG_MONITOR.stop()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -35,6 +429,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(MetricsMiddleware)
+
 # ================== STATIC FILES ==================
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -45,24 +441,1208 @@ app.mount(
     name="static"
 )
 
-# ================== V2 ROOMS (IN-MEMORY) ==================
+# ================== V2 ROOMS ==================
 
 import random
-import string
 import uuid
+import threading
+import time
+import sqlite3
+from contextlib import contextmanager
 from fastapi import HTTPException
 
 ROOMS = {}
 
-def generate_room_code(length=4):
-    return "".join(
-        random.choices(string.ascii_uppercase + string.digits, k=length)
-    )
+# ================== ROOM-MODELL (KOMPAKT) ==================
+# Spelare är Player-poster med __slots__. Alla svar i ett rum ligger i en
+# bytearray room["answers"]: en rad per fråga i room["questions"], en byte
+# per spelare (0 = inget svar, 1–4 = A–D), kolumn = Player.index.
+# room["results"] är raderna som räknats; resultat-dicts med namn byggs
+# först när /results ber om dem. room["tally"] räknar svar för aktuell
+# fråga – [antal svarat, A, B, C, D] – och hålls aktuell av set_answer.
+
+import base64
+
+ANSWER_LETTERS = "ABCD"
+ANSWER_CODES = {letter: i + 1 for i, letter in enumerate(ANSWER_LETTERS)}
+
+
+class Player:
+    __slots__ = ("id", "name", "score", "index")
+
+    def __init__(self, id: str, name: str, index: int, score: int = 0):
+        self.id = id
+        self.name = name
+        self.index = index
+        self.score = score
+
+
+def room_add_player(room, player_id: str, name: str) -> Player:
+    players = room["players"]
+    width = len(players)
+    player = players[player_id] = Player(player_id, name, width)
+
+    # Frågor redan satta (utan start): bredda varje rad med en kolumn
+    rows = len(room["questions"])
+    if rows:
+        old = room["answers"]
+        room["answers"] = bytearray(b"\0").join(
+            old[r * width:(r + 1) * width] for r in range(rows)
+        ) + b"\0"
+
+    return player
+
+
+def room_clear_answers(room):
+    room["questions"] = []
+    room["answers"] = bytearray()
+    room["results"] = []
+    room["tally"] = [0] * (len(ANSWER_LETTERS) + 1)
+
+
+def room_open_question(room, question: dict):
+    room["questions"].append(question)
+    room["answers"].extend(bytes(len(room["players"])))
+    room["tally"] = [0] * (len(ANSWER_LETTERS) + 1)
+
+
+def answer_row(room, row: int = -1) -> bytes:
+    width = len(room["players"])
+    if row < 0:
+        row += len(room["questions"])
+    return bytes(room["answers"][row * width:(row + 1) * width])
+
+
+def answer_of(room, player: Player, row: int = -1):
+    width = len(room["players"])
+    if row < 0:
+        row += len(room["questions"])
+    code = room["answers"][row * width + player.index]
+    return ANSWER_LETTERS[code - 1] if code else None
+
+
+def set_answer(room, player: Player, letter: str):
+    width = len(room["players"])
+    row = len(room["questions"]) - 1
+    cell = row * width + player.index
+    old, new = room["answers"][cell], ANSWER_CODES[letter]
+
+    # Bytt svar flyttar en röst; första svaret räknas som svarat
+    tally = room["tally"]
+    if old:
+        tally[old] -= 1
+    else:
+        tally[0] += 1
+    tally[new] += 1
+    room["answers"][cell] = new
+
+
+def room_tally(room) -> dict:
+    q = room.get("current_question")
+    tally = room["tally"] if q and room["questions"] else [0] * (len(ANSWER_LETTERS) + 1)
+    # Fördelningen visas först efter låsning – annars kan spelare (och en
+    # host som spelar) se vad andra svarat
+    return {
+        "question_id": q.get("id") if q else None,
+        "answered": tally[0],
+        "player_count": len(room["players"]),
+        "letters": dict(zip(ANSWER_LETTERS, tally[1:])) if room["answers_locked"] else None
+    }
+
+
+def result_entry(room, row: int) -> dict:
+    q = room["questions"][row]
+    correct_letter = q.get("correct_letter")
+    options = q.get("options", {})
+    right_players = []
+    wrong_players = []
+
+    for p in room["players"].values():
+        letter = answer_of(room, p, row)
+        entry = {
+            "name": p.name,
+            "answer_letter": letter,
+            "answer_text": options.get(letter, "") if letter else ""
+        }
+        (right_players if letter == correct_letter else wrong_players).append(entry)
+
+    return {
+        "question_id": q.get("id"),
+        "question": q.get("question"),
+        "category": q.get("category"),
+        "correct_letter": correct_letter,
+        "correct_text": options.get(correct_letter, ""),
+        "right_players": right_players,
+        "wrong_players": wrong_players
+    }
+
+
+def room_dump(room) -> dict:
+    # JSON-form för delad ROOM_STORE
+    data = dict(room)
+    data["players"] = [[p.id, p.name, p.score] for p in room["players"].values()]
+    data["answers"] = base64.b64encode(room["answers"]).decode("ascii")
+    return data
+
 
-TRANSLATION_CACHE: dict[str, str] = {}
+def room_load(data: dict) -> dict:
+    room = dict(data)
+    room["players"] = {
+        pid: Player(pid, name, index, score)
+        for index, (pid, name, score) in enumerate(data["players"])
+    }
+    room["answers"] = bytearray(base64.b64decode(data["answers"]))
+    return room
+
+# ================== ROOM STORE (MINNE / SQLITE) ==================
+# All room-state läses och skrivs via ROOM_STORE. "memory" (default) är
+# ROOMS ovan, i processen. "sqlite" lägger rummen i en delad SQLite-fil
+# (WAL) så flera uvicorn-workers / instanser på samma maskin ser samma
+# rum; varje worker följer ändringsloggen och pushar andras ändringar
+# till sina egna WebSocket- och long-poll-klienter.
+
+ROOM_STORE_BACKEND = os.getenv("ROOM_STORE", "memory")
+ROOM_STORE_DB = os.getenv("ROOM_STORE_DB", os.path.join(DATA_DIR, "rooms.sqlite3"))
+ROOM_STORE_POLL = float(os.getenv("ROOM_STORE_POLL", "0.1"))  # sekunder mellan ändringskollar
+ROOM_STORE_TOMBSTONE_TTL = 3600  # borttagna rum syns i ändringsloggen så här länge
+
+
+class RoomLocks:
+    """Ett lås per room: mutationer i samma rum körs en i taget, olika rum
+    låser aldrig varandra. Varje lås räknar sina hållare och väntande;
+    drop() tar bara bort ett lås som ingen använder."""
+
+    def __init__(self):
+        self.locks: dict[str, list] = {}  # code -> [RLock, hållare + väntande]
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def hold(self, code: str):
+        with self.lock:
+            entry = self.locks.get(code)
+            if entry is None:
+                entry = self.locks[code] = [threading.RLock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self.lock:
+                entry[1] -= 1
+
+    def drop(self, code: str):
+        # Med en väntande kvar skulle nästa anropare få ett nytt lås och
+        # mutera samtidigt – låset ligger kvar tills den sista släppt det
+        with self.lock:
+            entry = self.locks.get(code)
+            if entry is not None and entry[1] == 0:
+                del self.locks[code]
+
+
+class MemoryRoomStore:
+    """Rummen som vanliga dicts i processen – bara för en worker.
+
+    mutate() ger det levande rummet under rummets lås. Vyer byggs via
+    read() under samma lås, så ingen läser ett halvändrat rum (t.ex.
+    answers som skrivs om av reset mitt i en poängräkning).
+    """
+
+    shared = False
+
+    def __init__(self, rooms: dict):
+        self.rooms = rooms
+        self.lock = threading.Lock()
+        self.room_locks = RoomLocks()
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def get(self, code: str):
+        return self.rooms.get(code)
+
+    def exists(self, code: str) -> bool:
+        return code in self.rooms
+
+    def version(self, code: str):
+        room = self.rooms.get(code)
+        return None if room is None else room.get("version", 0)
+
+    def codes(self) -> list[str]:
+        return list(self.rooms)
+
+    def create(self, code: str, room: dict) -> bool:
+        with self.lock:
+            if code in self.rooms:
+                return False
+            self.rooms[code] = room
+            return True
+
+    @contextmanager
+    def read(self, code: str):
+        room = None
+        try:
+            with self.room_locks.hold(code):
+                room = self.rooms.get(code)
+                yield room
+        finally:
+            # Även när anroparen kastar (t.ex. 404) – annars läcker ett lås per okänd kod
+            if room is None:
+                self.room_locks.drop(code)
+
+    @contextmanager
+    def mutate(self, code: str):
+        room = None
+        try:
+            with self.room_locks.hold(code):
+                room = self.rooms.get(code)
+                yield room
+                if room is not None:
+                    room["version"] = room.get("version", 0) + 1
+        finally:
+            if room is None:
+                self.room_locks.drop(code)
+
+    def delete(self, code: str) -> bool:
+        with self.room_locks.hold(code):
+            deleted = self.rooms.pop(code, None) is not None
+        self.room_locks.drop(code)
+        return deleted
+
+    def last_active(self, code: str):
+        return None
+
+    def record_activity(self, activity: dict[str, float]):
+        pass
+
+    def head(self) -> int:
+        return 0
+
+    def changes_since(self, seq: int):
+        return seq, []
+
+
+class SQLiteRoomStore:
+    """Rummen som JSON-rader i en SQLite-fil (WAL) som delas mellan workers.
+
+    mutate() läser, ändrar och skriver tillbaka rummet i en BEGIN IMMEDIATE-
+    transaktion, så två workers aldrig skriver över varandras ändringar.
+    Varje skrivning får ett globalt löpnummer (seq) och changes_since()
+    listar rum som ändrats sedan ett visst seq. Borttagna rum blir
+    gravstenar (data NULL) så borttagningen också syns i loggen.
+    En anslutning per tråd; läsningar blockeras aldrig av skrivare i WAL.
+    """
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+        self.connections = []
+        self.own: set[int] = set()  # seq som den här processen skrivit
+        self.lock = threading.Lock()
+        # Samma rum köar i processen i stället för att snurra på SQLITE_BUSY
+        self.room_locks = RoomLocks()
+
+    def connect(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = sqlite3.connect(
+                self.path,
+                timeout=10,
+                isolation_level=None,
+                check_same_thread=False
+            )
+            db.execute("PRAGMA synchronous=NORMAL")
+            self.local.db = db
+            with self.lock:
+                self.connections.append(db)
+        return db
+
+    def open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        db = self.connect()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS rooms (
+                code TEXT PRIMARY KEY,
+                data TEXT,
+                version INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                active_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS rooms_seq ON rooms (seq);
+            CREATE TABLE IF NOT EXISTS room_seq (id INTEGER PRIMARY KEY CHECK (id = 0), value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO room_seq (id, value) VALUES (0, 0);
+            """
+        )
+        db.execute(
+            "DELETE FROM rooms WHERE data IS NULL AND active_at < ?",
+            (time.time() - ROOM_STORE_TOMBSTONE_TTL,)
+        )
+
+    def close(self):
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for db in connections:
+            db.close()
+        self.local = threading.local()
+
+    @contextmanager
+    def transaction(self):
+        db = self.connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def _next_seq(self, db) -> int:
+        db.execute("UPDATE room_seq SET value = value + 1 WHERE id = 0")
+        seq = db.execute("SELECT value FROM room_seq WHERE id = 0").fetchone()[0]
+        with self.lock:
+            self.own.add(seq)
+        return seq
+
+    def _write(self, db, code: str, room: dict | None):
+        data = None if room is None else json.dumps(room_dump(room), ensure_ascii=False)
+        version = 0 if room is None else room.get("version", 0)
+        db.execute(
+            """
+            INSERT INTO rooms (code, data, version, seq, active_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (code) DO UPDATE SET
+                data = excluded.data,
+                version = excluded.version,
+                seq = excluded.seq,
+                active_at = excluded.active_at
+            """,
+            (code, data, version, self._next_seq(db), time.time())
+        )
+
+    @staticmethod
+    def _load(row):
+        return room_load(json.loads(row[0])) if row and row[0] is not None else None
+
+    def get(self, code: str):
+        row = self.connect().execute(
+            "SELECT data FROM rooms WHERE code = ?", (code,)
+        ).fetchone()
+        return self._load(row)
+
+    def exists(self, code: str) -> bool:
+        return self.version(code) is not None
+
+    def version(self, code: str):
+        row = self.connect().execute(
+            "SELECT version FROM rooms WHERE code = ? AND data IS NOT NULL", (code,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def codes(self) -> list[str]:
+        rows = self.connect().execute("SELECT code FROM rooms WHERE data IS NOT NULL")
+        return [code for (code,) in rows]
+
+    def create(self, code: str, room: dict) -> bool:
+        with self.transaction() as db:
+            row = db.execute(
+                "SELECT 1 FROM rooms WHERE code = ? AND data IS NOT NULL", (code,)
+            ).fetchone()
+            if row:
+                return False
+            self._write(db, code, room)
+            return True
+
+    @contextmanager
+    def read(self, code: str):
+        # Egen kopia per läsning – inget lås behövs
+        yield self.get(code)
+
+    @contextmanager
+    def mutate(self, code: str):
+        room = None
+        try:
+            with self.room_locks.hold(code), self.transaction() as db:
+                room = self._load(
+                    db.execute("SELECT data FROM rooms WHERE code = ?", (code,)).fetchone()
+                )
+                yield room
+                if room is not None:
+                    room["version"] = room.get("version", 0) + 1
+                    self._write(db, code, room)
+        finally:
+            # Även när anroparen kastar (t.ex. 404) – annars läcker ett lås per okänd kod
+            if room is None:
+                self.room_locks.drop(code)
+
+    def delete(self, code: str) -> bool:
+        with self.room_locks.hold(code), self.transaction() as db:
+            deleted = self.exists(code)
+            if deleted:
+                self._write(db, code, None)
+        self.room_locks.drop(code)
+        return deleted
+
+    def last_active(self, code: str):
+        row = self.connect().execute(
+            "SELECT active_at FROM rooms WHERE code = ?", (code,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def record_activity(self, activity: dict[str, float]):
+        # Läsningar (poll, WebSocket-ping) räknas lokalt och skrivs i klump,
+        # så en worker inte sveper bort ett rum som en annan worker serverar
+        with self.transaction() as db:
+            db.executemany(
+                "UPDATE rooms SET active_at = MAX(active_at, ?) WHERE code = ? AND data IS NOT NULL",
+                [(ts, code) for code, ts in activity.items()]
+            )
+
+    def head(self) -> int:
+        return self.connect().execute("SELECT value FROM room_seq WHERE id = 0").fetchone()[0]
+
+    def changes_since(self, seq: int):
+        """(nytt seq, [(code, borttaget)]) för andra processers skrivningar."""
+        rows = self.connect().execute(
+            "SELECT code, seq, data IS NULL FROM rooms WHERE seq > ? ORDER BY seq", (seq,)
+        ).fetchall()
+
+        changes = []
+        with self.lock:
+            for code, row_seq, deleted in rows:
+                seq = max(seq, row_seq)
+                if row_seq not in self.own:
+                    changes.append((code, bool(deleted)))
+            # Egna skrivningar som skrivits över av en senare hittas aldrig
+            self.own = {s for s in self.own if s > seq}
+        return seq, changes
+
+
+def make_room_store(backend: str):
+    if backend == "sqlite":
+        return SQLiteRoomStore(ROOM_STORE_DB)
+    if backend != "memory":
+        print(f"[ROOMS] unknown ROOM_STORE={backend!r}, using memory")
+    return MemoryRoomStore(ROOMS)
+
+
+ROOM_STORE = make_room_store(ROOM_STORE_BACKEND)
+
+# ================== LIVE PUSH (PUB/SUB PER ROOM) ==================
+
+import asyncio
+
+
+async def store_call(fn, *args):
+    # SQLite-storen gör disk-I/O (och kan vänta på skrivlås) – aldrig på event-loopen
+    if ROOM_STORE.shared:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+class RoomHub:
+    """Håller WebSocket-lyssnare och long-polls per room.
+
+    publish() anropas efter varje ändring (ROOM_STORE.mutate har redan
+    bumpat room["version"]): den väcker väntande long-polls och pushar
+    state till WebSocket-lyssnare. Ändringar från andra workers hittas av
+    follow() och publiceras på samma sätt.
+    Varje lyssnare får sin rolls vy (room_view), serialiserad en gång
+    per vy och ändring. publish(..., player_id=...) är för ändringar som
+    bara syns i host/TV och den spelarens egen vy (ett svar) – övriga
+    telefoner väcks inte, annars blir varje fråga N² pushar.
+    Endpoints körs i threadpool, så allt som rör asyncio läggs på
+    event-loopen med call_soon_threadsafe. Varje lyssnare har en kö med
+    plats för ett meddelande – state är alltid en hel snapshot, så en
+    långsam klient får bara det senaste.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.listeners: dict[str, dict[asyncio.Queue, tuple]] = defaultdict(dict)
+        self.waiters: dict[str, dict[asyncio.Future, tuple]] = defaultdict(dict)
+        self.seq = 0
+        self.task = None
+
+    def subscribe(self, code: str, role: str, player_id: str | None = None) -> asyncio.Queue:
+        self.loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=1)
+        self.listeners[code][queue] = (role, player_id)
+        return queue
+
+    def unsubscribe(self, code: str, queue: asyncio.Queue):
+        listeners = self.listeners.get(code)
+        if listeners is None:
+            return
+        listeners.pop(queue, None)
+        if not listeners:
+            self.listeners.pop(code, None)
+
+    def count(self, code: str) -> int:
+        return len(self.listeners.get(code, ()))
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, payload: str):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(payload)
+
+    @staticmethod
+    def affected(view_key: tuple, player_id: str | None) -> bool:
+        # player_id=None: alla vyer; annars host/TV och den spelarens vy
+        role, viewer = view_key
+        return player_id is None or role != "player" or viewer == player_id
+
+    def _wake(self, code: str, player_id: str | None = None):
+        waiters = self.waiters.get(code)
+        if not waiters:
+            return
+        for future, view_key in list(waiters.items()):
+            if self.affected(view_key, player_id):
+                waiters.pop(future, None)
+                if not future.done():
+                    future.set_result(None)
+        if not waiters:
+            self.waiters.pop(code, None)
+
+    async def wait_for_change(
+        self,
+        code: str,
+        since: int,
+        timeout: float,
+        role: str = "tv",
+        player_id: str | None = None
+    ):
+        """Väntar tills room-versionen skiljer sig från since (eller timeout)."""
+        # Registrera först, jämför sedan – en publish() mellan de två stegen
+        # hittar då vår future i stället för att gå förlorad
+        self.loop = asyncio.get_running_loop()
+        future = self.loop.create_future()
+        self.waiters[code][future] = (role, player_id)
+
+        try:
+            version = await store_call(ROOM_STORE.version, code)
+            if version is None or version != since:
+                return
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiters = self.waiters.get(code)
+            if waiters is not None:
+                waiters.pop(future, None)
+                if not waiters:
+                    self.waiters.pop(code, None)
+
+    @staticmethod
+    def message(room, event: str, role: str, player_id: str | None = None) -> str:
+        # Vyn kodas via VIEW_CACHE – pollande klienter får samma bytes gratis
+        view = view_body(room, role, player_id) if room is not None else b"null"
+        return (
+            b'{"type":"room","event":' + json_bytes(event) + b',"room":' + view + b"}"
+        ).decode("utf-8")
+
+    def snapshot(self, code: str, role: str, player_id: str | None = None) -> str:
+        with ROOM_STORE.read(code) as room:
+            return self.message(room, "snapshot", role, player_id)
+
+    def publish(self, code: str, event: str, player_id: str | None = None):
+        ROOM_LIFECYCLE.touch(code)
+
+        if self.loop is None:
+            return
+
+        if self.waiters.get(code):
+            self.loop.call_soon_threadsafe(self._wake, code, player_id)
+
+        listeners = self.listeners.get(code)
+        if not listeners:
+            return
+
+        payloads = {}
+
+        with ROOM_STORE.read(code) as room:
+            for queue, view_key in list(listeners.items()):
+                if not self.affected(view_key, player_id):
+                    continue
+                if view_key not in payloads:
+                    payloads[view_key] = self.message(room, event, *view_key)
+                self.loop.call_soon_threadsafe(self._offer, queue, payloads[view_key])
+
+    def sync(self):
+        # Körs i tråd: publicera rum som andra workers ändrat sedan self.seq
+        self.seq, changes = ROOM_STORE.changes_since(self.seq)
+        for code, deleted in changes:
+            if deleted:
+                ROOM_LIFECYCLE.forget(code)
+            else:
+                ROOM_LIFECYCLE.observe(code)
+            self.publish(code, "evicted" if deleted else "sync")
+
+    async def follow(self):
+        while True:
+            await asyncio.sleep(ROOM_STORE_POLL)
+            try:
+                await asyncio.to_thread(self.sync)
+            except sqlite3.Error as e:
+                print(f"[ROOMS] sync failed: {e!r}")
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        if ROOM_STORE.shared:
+            self.seq = await asyncio.to_thread(ROOM_STORE.head)
+            self.task = asyncio.create_task(self.follow())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        self.task = None
+
+
+ROOM_HUB = RoomHub()
+
+# ================== ROOM-LIVSCYKEL ==================
+# ROOMS rensas: senaste aktivitet spåras per room (mutationer, läsningar,
+# WebSocket-ping), en sweeper tar bort rum som legat stilla längre än
+# fasens TTL och ett tak på antal rum tränger ut det minst aktiva.
+# Med delad ROOM_STORE spåras aktivitet per worker och skrivs till
+# storen vid varje svep; ett rum tas bara bort om ingen worker rört det.
+
+ROOM_MAX = int(os.getenv("ROOM_MAX", "2000"))
+ROOM_SWEEP_INTERVAL = int(os.getenv("ROOM_SWEEP_INTERVAL", "60"))
+ROOM_EVICT_MIN_IDLE = 60  # ett rum aktivt senaste minuten trängs aldrig ut
+
+# Rum utan spelare och utan host (crawlers, omladdningar) lever kort
+ROOM_TTL_EMPTY = int(os.getenv("ROOM_TTL_EMPTY", str(15 * 60)))
+ROOM_TTL = {
+    phase: int(os.getenv(f"ROOM_TTL_{phase.upper()}", str(default)))
+    for phase, default in {
+        "idle": 2 * 3600,
+        "question": 30 * 60,
+        "locked": 30 * 60,
+        "scoreboard": 3600
+    }.items()
+}
+
+
+class RoomLifecycle:
+    def __init__(self, max_rooms: int):
+        self.max_rooms = max_rooms
+        self.activity: OrderedDict[str, float] = OrderedDict()
+        self.lock = threading.Lock()
+        self.created = 0
+        self.evicted = defaultdict(int)  # per orsak
+        self.task = None
+
+    def touch(self, code: str):
+        with self.lock:
+            if code in self.activity:
+                self.activity[code] = time.time()
+                self.activity.move_to_end(code)
+
+    def observe(self, code: str):
+        # Rum skapat av en annan worker – följ det utan kapacitetskontroll
+        ROOM_CODES.claim(code)
+        with self.lock:
+            if code not in self.activity:
+                self.activity[code] = time.time()
+
+    def resume(self):
+        # Rum som redan låg i en delad store vid start – sync() ser bara nyare skrivningar
+        for code in ROOM_STORE.codes():
+            self.observe(code)
+
+    def forget(self, code: str):
+        # Borttaget av en annan worker
+        with self.lock:
+            self.activity.pop(code, None)
+        ROOM_CODES.release(code)
+        QUESTION_INDEX.drop(f"room:{code}")
+        VIEW_CACHE.drop(code)
+
+    def register(self, code: str):
+        with self.lock:
+            if len(self.activity) >= self.max_rooms and code not in self.activity:
+                oldest, last_active = next(iter(self.activity.items()))
+                if time.time() - last_active < ROOM_EVICT_MIN_IDLE:
+                    raise HTTPException(status_code=503, detail="Too many rooms")
+                victim = oldest
+            else:
+                victim = None
+
+            self.activity[code] = time.time()
+            self.activity.move_to_end(code)
+            self.created += 1
+
+        if victim:
+            self.evict(victim, "capacity")
+
+    def ttl(self, room) -> float:
+        if not room["players"] and not room.get("host_ready"):
+            return ROOM_TTL_EMPTY
+        return ROOM_TTL.get(room["phase"], ROOM_TTL["idle"])
+
+    def evict(self, code: str, reason: str):
+        with self.lock:
+            self.activity.pop(code, None)
+        if not ROOM_STORE.delete(code):
+            return
+
+        ROOM_CODES.release(code)
+        self.evicted[reason] += 1
+        QUESTION_INDEX.drop(f"room:{code}")
+        VIEW_CACHE.drop(code)
+        ROOM_HUB.publish(code, "evicted")
+
+    def sweep(self, now: float | None = None) -> int:
+        now = now or time.time()
+        min_ttl = min(ROOM_TTL_EMPTY, *ROOM_TTL.values())
+        candidates = []
+
+        with self.lock:
+            if ROOM_STORE.shared:
+                activity = dict(self.activity)
+            # Äldst först – efter första rummet yngre än minsta TTL kan inget gå ut
+            for code, last_active in self.activity.items():
+                idle = now - last_active
+                if idle < min_ttl:
+                    break
+                candidates.append((code, idle))
+
+        if ROOM_STORE.shared:
+            ROOM_STORE.record_activity(activity)
+
+        expired = []
+        for code, idle in candidates:
+            with ROOM_STORE.read(code) as room:
+                ttl = None if room is None else self.ttl(room)
+            if ttl is None:
+                expired.append(code)
+                continue
+            last_active = ROOM_STORE.last_active(code)
+            if last_active:
+                idle = min(idle, now - last_active)
+            if idle >= ttl:
+                expired.append(code)
+
+        for code in expired:
+            self.evict(code, "idle")
+        return len(expired)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(ROOM_SWEEP_INTERVAL)
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                print(f"[ROOMS] sweep failed: {e!r}")
+
+    async def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        self.task = None
+
+
+ROOM_LIFECYCLE = RoomLifecycle(ROOM_MAX)
+
+
+def new_room(code: str, host_plays: bool = False) -> dict:
+    ROOM_CODES.claim(code)
+    try:
+        ROOM_LIFECYCLE.register(code)
+    except HTTPException:
+        ROOM_CODES.release(code)
+        raise
+
+    room = {
+        "code": code,
+        "host_plays": host_plays,
+        "players": {},
+        "started": False,
+        "current_question": None,
+        "difficulty": "medium",
+        "timer": None,
+        "phase": "idle",
+        "answers_locked": False,
+        "last_result": None,
+        "questions": [],
+        "answers": bytearray(),
+        "results": [],
+        "tally": [0] * (len(ANSWER_LETTERS) + 1),
+        "board": {"scores": [], "counts": [], "above": [], "top": []},
+        "host_ready": False,
+        "version": 0
+    }
+    if not ROOM_STORE.create(code, room):
+        # En annan worker hann skapa samma ?room=-kod först
+        return ROOM_STORE.get(code)
+    return room
+
+# ================== ROOM-KODER (ALLOKATOR) ==================
+
+import secrets
+
+# Inga lättförväxlade tecken: 0/O, 1/I/L
+ROOM_CODE_ALPHABET = "ABCDEFGHJKMNPQRSTUVWXYZ23456789"
+ROOM_CODE_MIN_LENGTH = 4
+ROOM_CODE_MAX_LOAD = 0.5  # väx ett tecken när halva kodrymden är upptagen
+
+
+class RoomCodeAllocator:
+    """Delar ut unika room-koder bland levande rum.
+
+    Slumpar kod och kontrollerar mot mängden levande koder. Längden växer
+    när beläggningen för nuvarande längd passerar ROOM_CODE_MAX_LOAD, så
+    förväntat antal försök är alltid < 2 (O(1)). Koder lämnas tillbaka när
+    ett rum tas bort.
+    """
+
+    def __init__(self, alphabet: str, min_length: int, max_load: float):
+        self.alphabet = alphabet
+        self.length = min_length
+        self.max_load = max_load
+        self.live: set[str] = set()
+        self.per_length: dict[int, int] = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def _capacity(self, length: int) -> int:
+        return len(self.alphabet) ** length
+
+    def allocate(self) -> str:
+        with self.lock:
+            while self.per_length[self.length] + 1 > self.max_load * self._capacity(self.length):
+                self.length += 1
+
+            while True:
+                code = "".join(secrets.choice(self.alphabet) for _ in range(self.length))
+                if code not in self.live:
+                    self._add(code)
+                    return code
+
+    def _add(self, code: str):
+        self.live.add(code)
+        self.per_length[len(code)] += 1
+
+    def claim(self, code: str):
+        # Koder som kommer utifrån (?room=) räknas också som upptagna
+        with self.lock:
+            if code not in self.live:
+                self._add(code)
+
+    def release(self, code: str):
+        with self.lock:
+            if code in self.live:
+                self.live.discard(code)
+                self.per_length[len(code)] -= 1
+
+
+ROOM_CODES = RoomCodeAllocator(ROOM_CODE_ALPHABET, ROOM_CODE_MIN_LENGTH, ROOM_CODE_MAX_LOAD)
+
+
+def generate_room_code() -> str:
+    while True:
+        code = ROOM_CODES.allocate()
+        # Delad store: koden kan vara tagen av en annan worker (förblir claimad)
+        if not ROOM_STORE.shared or not ROOM_STORE.exists(code):
+            return code
+
+# ================== ÖVERSÄTTNINGSCACHE (LRU + SQLITE) ==================
+
+import sqlite3
+
+TRANSLATION_CACHE_MAX = int(os.getenv("TRANSLATION_CACHE_MAX", "20000"))
+TRANSLATION_CACHE_DB = os.getenv(
+    "TRANSLATION_CACHE_DB",
+    os.path.join(DATA_DIR, "translations.sqlite3")
+)
+TRANSLATION_FAILURE_TTL = 300  # sekunder innan en misslyckad sträng provas igen
+
+
+class TranslationCache:
+    """LRU-begränsad översättningscache framför en SQLite-fil.
+
+    Lyckade översättningar sparas på disk och överlever omstarter; open()
+    värmer minnet med de senast sparade. Misslyckade uppslag hålls separat
+    och bara i TRANSLATION_FAILURE_TTL sekunder, så ett DeepL-avbrott inte
+    stänger av översättningen för gott. Utan open() fungerar den som ren
+    minnescache.
+    """
+
+    def __init__(self, path: str, max_entries: int, failure_ttl: float):
+        self.path = path
+        self.max_entries = max_entries
+        self.failure_ttl = failure_ttl
+        self.entries: OrderedDict[str, str] = OrderedDict()
+        self.failures: dict[str, float] = {}
+        self.lock = threading.Lock()
+        self.db = None
+        self.lookups: dict[str, int] = defaultdict(int)  # memory / disk / miss
+
+    def open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "source TEXT PRIMARY KEY, target TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        db.commit()
+
+        rows = db.execute(
+            "SELECT source, target FROM translations ORDER BY stored_at DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+
+        with self.lock:
+            self.db = db
+            for source, target in reversed(rows):
+                self.entries[source] = target
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+    def _remember(self, source: str, target: str):
+        self.entries[source] = target
+        self.entries.move_to_end(source)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get(self, source: str) -> str | None:
+        with self.lock:
+            target = self.entries.get(source)
+            if target is not None:
+                self.entries.move_to_end(source)
+                self.lookups["memory"] += 1
+                return target
+
+            if self.db is None:
+                self.lookups["miss"] += 1
+                return None
+
+            # Utträngd ur minnet men finns kvar på disk
+            row = self.db.execute(
+                "SELECT target FROM translations WHERE source = ?", (source,)
+            ).fetchone()
+            if row is None:
+                self.lookups["miss"] += 1
+                return None
+
+            self._remember(source, row[0])
+            self.lookups["disk"] += 1
+            return row[0]
+
+    def put_many(self, pairs):
+        now = time.time()
+        pairs = list(pairs)
+
+        with self.lock:
+            for source, target in pairs:
+                self._remember(source, target)
+                self.failures.pop(source, None)
+
+            if self.db is not None and pairs:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO translations (source, target, stored_at) "
+                    "VALUES (?, ?, ?)",
+                    [(source, target, now) for source, target in pairs]
+                )
+                self.db.commit()
+
+    def put(self, source: str, target: str):
+        self.put_many([(source, target)])
+
+    def recently_failed(self, source: str) -> bool:
+        with self.lock:
+            expires = self.failures.get(source)
+            if expires is None:
+                return False
+            if expires <= time.time():
+                del self.failures[source]
+                return False
+            return True
+
+    def put_failures(self, sources):
+        expires = time.time() + self.failure_ttl
+
+        with self.lock:
+            # Håll negativ-cachen liten: rensa utgångna när den växer
+            if len(self.failures) > self.max_entries:
+                now = time.time()
+                self.failures = {s: e for s, e in self.failures.items() if e > now}
+            for source in sources:
+                self.failures[source] = expires
+
+    def __len__(self):
+        return len(self.entries)
+
+
+TRANSLATION_CACHE = TranslationCache(
+    TRANSLATION_CACHE_DB,
+    TRANSLATION_CACHE_MAX,
+    TRANSLATION_FAILURE_TTL
+)
 
 DEEPL_KEY = os.getenv("DEEPL_API_KEY")
-DEEPL_URL = "https://api-free.deepl.com/v2/translate"
+DEEPL_URL = os.getenv("DEEPL_URL", "https://api-free.deepl.com/v2/translate")
+
+# Kan pekas om mot lokala stubbar (loadtest.py)
+OPENTDB_URL = os.getenv("OPENTDB_URL", "https://opentdb.com/api.php")
+OPENTDB_TOKEN_URL = os.getenv("OPENTDB_TOKEN_URL", OPENTDB_URL.rsplit("/", 1)[0] + "/api_token.php")
+TRIVIA_API_URL = os.getenv("TRIVIA_API_URL", "https://the-trivia-api.com/api/questions")
+
+# ================== UPSTREAM-KLIENT (HTTPX, POOLAD) ==================
+# En delad keep-alive-klient per upstream: egna anslutningsgränser,
+# deadline per anrop, begränsade omförsök med jitter och en circuit breaker
+# som svarar direkt medan upstream är nere.
+
+import httpx
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class UpstreamUnavailable(UpstreamError):
+    """Circuit breakern är öppen – upstream hoppas över utan anrop."""
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "half_open":
+            # Släpp igenom ett provanrop, stäng igen tills det svarat
+            self.opened_at = time.monotonic()
+        return state != "open"
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class Upstream:
+    def __init__(
+        self,
+        name: str,
+        max_connections: int,
+        timeout: float,
+        deadline: float,
+        retries: int,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30
+    ):
+        self.name = name
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self.client = None
+
+    def _client(self) -> httpx.AsyncClient:
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self.client
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def _attempts(self, method: str, url: str, **kwargs) -> httpx.Response:
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                r = await self._client().request(method, url, **kwargs)
+                if r.status_code not in RETRY_STATUS or last:
+                    r.raise_for_status()
+                    return r
+            except httpx.TransportError:
+                if last:
+                    raise
+
+            # Exponentiell backoff med full jitter
+            await asyncio.sleep(random.uniform(0, 0.25 * 2 ** attempt))
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        if not self.breaker.allow():
+            UPSTREAM_RESULTS.inc(self.name, "circuit_open")
+            raise UpstreamUnavailable(f"{self.name} circuit open")
+
+        start = time.perf_counter()
+        try:
+            r = await asyncio.wait_for(
+                self._attempts(method, url, **kwargs),
+                self.deadline
+            )
+        except (httpx.HTTPError, asyncio.TimeoutError) as e:
+            UPSTREAM_LATENCY.observe(time.perf_counter() - start, self.name)
+            UPSTREAM_RESULTS.inc(self.name, "error")
+            self.breaker.failure()
+            raise UpstreamError(f"{self.name}: {e!r}") from e
+
+        UPSTREAM_LATENCY.observe(time.perf_counter() - start, self.name)
+        UPSTREAM_RESULTS.inc(self.name, "ok")
+        self.breaker.success()
+        return r
+
+    async def get_json(self, url: str, **kwargs):
+        return (await self.request("GET", url, **kwargs)).json()
+
+    async def post_json(self, url: str, **kwargs):
+        return (await self.request("POST", url, **kwargs)).json()
+
+
+OPENTDB = Upstream("opentdb", max_connections=2, timeout=8, deadline=15, retries=2)
+TRIVIA_API = Upstream("trivia_api", max_connections=4, timeout=5, deadline=8, retries=1)
+DEEPL = Upstream("deepl", max_connections=8, timeout=5, deadline=10, retries=2)
+UPSTREAMS = [OPENTDB, TRIVIA_API, DEEPL]
 
 # ================== HJÄLPREGLER ==================
 
@@ -87,17 +1667,54 @@ GAME_KEYWORDS = [
 ]
 
 # ================== DETEKTION ==================
+# Nyckelorden kompileras till trie-formade regexar ("st(?:age|one)"), så
+# regex-motorn gör ett pass över texten i stället för en `in`-skanning per
+# nyckelord. KEYWORD_RE har båda listorna i samma pass; vilken lista som
+# träffade avgörs av det matchade ordet. (Att köra hela omgången som en
+# sträng lönar sig inte här – search() per text slutar vid första träffen.)
+
+
+
+def keyword_pattern(keywords) -> re.Pattern:
+    """Ett mönster som träffar om texten innehåller något av orden."""
+    # Ord som innehåller ett kortare nyckelord behövs inte för "finns något"
+    kept = []
+    for word in sorted(set(keywords), key=len):
+        if not any(k in word for k in kept):
+            kept.append(word)
+
+    trie = {}
+    for word in kept:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        if "" in node:
+            return ""
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+
+    return re.compile(build(trie))
+
+
+VERB_RE = keyword_pattern(VERB_HINTS)
+MEDIA_RE = keyword_pattern(MEDIA_KEYWORDS)
+GAME_RE = keyword_pattern(GAME_KEYWORDS)
+KEYWORD_RE = keyword_pattern(GAME_KEYWORDS + MEDIA_KEYWORDS)
+KEYWORD_KINDS = {**{k: "media" for k in MEDIA_KEYWORDS}, **{k: "game" for k in GAME_KEYWORDS}}
+
 
 def looks_like_name_or_title(text: str) -> bool:
     words = text.strip().split()
     if len(words) > 5:
         return False
 
-    lower = f" {text.lower()} "
-    if any(v in lower for v in VERB_HINTS):
+    if VERB_RE.search(f" {text.lower()} "):
         return False
 
-    caps_ratio = sum(1 for c in text if c.isupper()) / max(len(text), 1)
+    caps_ratio = sum(map(str.isupper, text)) / max(len(text), 1)
     return caps_ratio > 0.3
 
 
@@ -108,402 +1725,1053 @@ def length_diff_too_big(original: str, translated: str) -> bool:
     return diff > 0.6
 
 
-def is_media_question(text: str) -> bool:
-    t = text.lower()
-    return any(k in t for k in MEDIA_KEYWORDS)
+def is_media_question(text: str) -> bool:
+    return MEDIA_RE.search(text.lower()) is not None
+
+
+def is_game_question(text: str) -> bool:
+    return GAME_RE.search(text.lower()) is not None
+
+
+def classify_question(text: str) -> str | None:
+    """"game", "media" eller None – samma företräde som is_game_question före is_media_question."""
+    t = text.lower()
+    m = KEYWORD_RE.search(t)
+    if m is None:
+        return None
+    # Ett medieord kan ha skymt ett spelord som börjar inuti det
+    if KEYWORD_KINDS[m.group()] == "game" or GAME_RE.search(t, m.start()):
+        return "game"
+    return "media"
+
+
+def classify_questions(texts: list[str]) -> list[str | None]:
+    return [classify_question(t) for t in texts]
+
+
+def looks_like_quote(text: str) -> bool:
+    return '"' in text or "'" in text or len(text.split()) > 6
+
+# ================== NORMALISERING ==================
+
+NUMBER_REPLACEMENTS = [
+    (re.compile(pattern, re.IGNORECASE), repl)
+    for pattern, repl in (
+        (r"Less than (\d+)\s*Thousand", r"Mindre än \1 000"),
+        (r"(\d+)\s*Thousand", r"\1 000"),
+        (r"(\d+)\s*Million", r"\1 miljon"),
+    )
+]
+
+
+# Hela omgången körs som en sträng med en separator som inget mönster matchar
+BATCH_SEPARATOR = "\x00"
+
+
+def normalize_numbers(text: str) -> str:
+    if not text:
+        return text
+
+    for pattern, repl in NUMBER_REPLACEMENTS:
+        text = pattern.sub(repl, text)
+
+    return text
+
+
+def normalize_numbers_batch(texts: list[str]) -> list[str]:
+    """normalize_numbers för en hel lista – tre regex-pass totalt i stället för tre per text."""
+    if not texts or any(BATCH_SEPARATOR in t for t in texts):
+        return [normalize_numbers(t) for t in texts]
+
+    # \s matchar inte separatorn, så inget mönster når över två texter
+    return normalize_numbers(BATCH_SEPARATOR.join(texts)).split(BATCH_SEPARATOR)
+
+# ================== ÖVERSÄTTNING ==================
+
+DEEPL_BATCH_MAX = 50     # DeepL tar max 50 text-parametrar per anrop
+DEEPL_CONCURRENCY = 4
+
+
+def split_cached(texts: list[str]) -> tuple[dict[str, str], list[str]]:
+    """Delar upp i (redan kända, måste översättas). Blockerande (SQLite)."""
+    known = {}
+    missing = []
+
+    for text in dict.fromkeys(texts):
+        if not DEEPL_KEY or not text:
+            known[text] = text
+            continue
+
+        cached = TRANSLATION_CACHE.get(text)
+        if cached is not None:
+            known[text] = cached
+        elif TRANSLATION_CACHE.recently_failed(text):
+            known[text] = text
+        else:
+            missing.append(text)
+
+    return known, missing
+
+
+async def deepl_translate_batch(texts: list[str]) -> dict[str, str]:
+    """Översätter många strängar med så få DeepL-anrop som möjligt.
+
+    Okända strängar skickas i block om DEEPL_BATCH_MAX, parallellt.
+    Returnerar {original: översättning}; fel ger originalet tillbaka
+    (och negativ-cachas en kort stund).
+    """
+    result, missing = await asyncio.to_thread(split_cached, texts)
+
+    if not missing:
+        return result
+
+    chunks = [
+        missing[i:i + DEEPL_BATCH_MAX]
+        for i in range(0, len(missing), DEEPL_BATCH_MAX)
+    ]
+    slots = asyncio.Semaphore(DEEPL_CONCURRENCY)
+
+    async def send(chunk):
+        try:
+            async with slots:
+                data = await DEEPL.post_json(
+                    DEEPL_URL,
+                    data={
+                        "auth_key": DEEPL_KEY,
+                        "target_lang": "SV",
+                        "text": list(chunk)
+                    }
+                )
+            translations = data["translations"]
+            if len(translations) != len(chunk):
+                raise ValueError("DeepL returned wrong number of translations")
+            pairs = [(src, t["text"]) for src, t in zip(chunk, translations)]
+            await asyncio.to_thread(TRANSLATION_CACHE.put_many, pairs)
+            return pairs
+        except Exception:
+            TRANSLATION_CACHE.put_failures(chunk)
+            return [(src, src) for src in chunk]
+
+    for pairs in await asyncio.gather(*(send(chunk) for chunk in chunks)):
+        result.update(pairs)
+
+    return result
+
+
+async def deepl_translate(text: str) -> str:
+    return (await deepl_translate_batch([text]))[text]
+
+
+def wants_translation(text: str) -> bool:
+    if not text or len(text.strip()) < 2:
+        return False
+    return not looks_like_name_or_title(text)
+
+
+def accept_translation(text: str, translated: str) -> str:
+    if translated == text:
+        return text
+
+    if length_diff_too_big(text, translated):
+        return text
+
+    return translated
+
+
+async def smart_translate(text: str) -> str:
+    if not wants_translation(text):
+        return text
+
+    return accept_translation(text, await deepl_translate(text))
+
+
+async def smart_translate_batch(texts: list[str]) -> list[str]:
+    """Som smart_translate, men hela listan i ett (eller några) DeepL-anrop."""
+    wanted = [wants_translation(t) for t in texts]
+    translated = await deepl_translate_batch([t for t, w in zip(texts, wanted) if w])
+
+    return [
+        accept_translation(t, translated.get(t, t)) if w else t
+        for t, w in zip(texts, wanted)
+    ]
+
+# ================== V2 ROOM API ==================
+
+import time
+from fastapi import Body, HTTPException, Request
+
+@app.post("/room/create")
+def create_room(request: Request, host_plays: bool = False):
+    code = generate_room_code()
+
+    new_room(code, host_plays=host_plays)
+
+    prefetch_room_qr(request, code)
+
+    return {
+        "roomCode": code,
+        "host_plays": host_plays
+    }
+
+@app.post("/room/join")
+def join_room(room: str, name: str):
+    room_code = room.upper()
+    with ROOM_STORE.mutate(room_code) as room_data:
+        if not room_data:
+            raise HTTPException(status_code=404, detail="Room not found")
+
+        if room_data["started"]:
+            raise HTTPException(status_code=400, detail="Game already started")
+
+        # Unika spelnamn (case-insensitive)
+        for p in room_data["players"].values():
+            if p.name.lower() == name.lower():
+                raise HTTPException(status_code=400, detail="Name already taken")
+
+        player_id = str(uuid.uuid4())[:8]
+
+        room_add_player(room_data, player_id, name)
+        board_add(room_board(room_data), 0, 1)
+        board_refresh(room_data)
+
+    ROOM_HUB.publish(room_code, "joined")
+
+    return {
+        "playerId": player_id,
+        "roomCode": room_code,
+        "name": name
+    }
+
+@app.post("/room/start")
+def start_room(room: str, payload: dict = Body(default={})):
+    room_code = room.upper()
+    with ROOM_STORE.mutate(room_code) as room_data:
+        if not room_data:
+            raise HTTPException(status_code=404, detail="Room not found")
+
+        room_data["started"] = True
+        room_data["difficulty"] = payload.get("difficulty", "medium")
+
+        # ✅ SPARA VALD KATEGORI (DETTA VAR DET SOM SAKNADES)
+        room_data["category_name"] = payload.get("category", "Allmänbildning")
+
+        # Nollställ spelstate
+        room_data["current_question"] = None
+        room_data["timer"] = None
+        room_data["phase"] = "idle"
+        room_data["answers_locked"] = False
+
+        # Nollställ spelardata
+        room_clear_answers(room_data)
+        for player in room_data["players"].values():
+            player.score = 0
+        board_rebuild(room_data)
+
+    ROOM_HUB.publish(room_code, "started")
+
+    return {"status": "started", "roomCode": room_code}
+
+@app.post("/room/question")
+def set_question(room: str, question: dict):
+    import json
+    import time
+
+    room_code = room.upper()
+
+    # Poängräkningen slår upp rätt svar i ANSWER_CODES när timern går ut
+    correct_letter = question.get("correct_letter")
+    if not isinstance(correct_letter, str) or correct_letter not in ANSWER_CODES:
+        raise HTTPException(status_code=400, detail="Invalid correct_letter")
+
+    with ROOM_STORE.mutate(room_code) as room_data:
+        if not room_data:
+            raise HTTPException(status_code=404, detail="Room not found")
+
+        # ===== KATEGORI =====
+        question["category"] = room_data.get("category_name", "Allmänbildning")
+
+        # ===== STABILT FRÅGE-ID =====
+        if not question.get("id"):
+            canonical = json.dumps(
+                question,
+                sort_keys=True,
+                ensure_ascii=False,
+                separators=(",", ":")
+            )
+            question["id"] = hashlib.sha1(
+                canonical.encode("utf-8")
+            ).hexdigest()[:10]
+
+        room_data["current_question"] = question
+
+        # ===== ANSWER-SLOTS (KRITISKT) =====
+        room_open_question(room_data, question)
+
+        DIFFICULTY_SECONDS = {
+            "easy": 25,
+            "medium": 20,
+            "hard": 15
+        }
+
+        difficulty = question.get("difficulty") or room_data.get("difficulty", "medium")
+        seconds = DIFFICULTY_SECONDS.get(difficulty, 20)
+
+        now = time.time()
+        room_data["timer"] = {"ends_at": now + seconds}
+        room_data["phase"] = "question"
+        room_data["answers_locked"] = False
+
+        # ⏱️ Lås + poängräkning sker server-side exakt vid ends_at
+        ROOM_TIMERS.schedule(room_code, room_data["timer"]["ends_at"])
+
+    ROOM_HUB.publish(room_code, "question")
+
+    return {
+        "status": "question_set",
+        "roomCode": room_code,
+        "question_id": question["id"],
+        "difficulty": difficulty,
+        "seconds": seconds
+    }
+
+@app.post("/room/answer")
+def submit_answer(room: str, player_id: str, answer: str):
+    room_code = room.upper()
+    with ROOM_STORE.mutate(room_code) as room_data:
+        if not room_data:
+            raise HTTPException(status_code=404, detail="Room not found")
+
+        if room_data.get("answers_locked"):
+            raise HTTPException(status_code=400, detail="Answers are locked")
+
+        if not room_data.get("current_question"):
+            raise HTTPException(status_code=400, detail="No active question")
+
+        player = room_data["players"].get(player_id)
+        if not player:
+            raise HTTPException(status_code=404, detail="Player not found")
+
+        if answer not in ANSWER_CODES:
+            raise HTTPException(status_code=400, detail="Invalid answer")
+
+        if not room_data["questions"]:
+            raise HTTPException(status_code=400, detail="Answer slot not initialized")
+
+        # tillåt byte av svar tills timer låser
+        set_answer(room_data, player, answer)
+
+    # Svaret syns bara i host/TV och spelarens egen vy
+    ROOM_HUB.publish(room_code, "answer", player_id)
+
+    return {"status": "answer_received"}
+
+def lock_and_score(room):
+    """Låser svar och räknar poäng om timern har gått ut. True om låst nu.
+
+    Anropas av ROOM_TIMERS vid ends_at; resultatet räknas en gång.
+    """
+    if not room.get("timer") or room.get("answers_locked") or room.get("phase") != "question":
+        return False
+
+    ends_at = room["timer"].get("ends_at")
+    if not ends_at or time.time() < ends_at:
+        return False
+
+    room["answers_locked"] = True
+    room["phase"] = "locked"
+
+    correct_letter = room["current_question"].get("correct_letter")
+    correct_code = ANSWER_CODES.get(correct_letter, 0)
+    row = len(room["questions"]) - 1
+
+    # Antal rätt finns redan i room["tally"]; bara vinnarna behöver raden
+    right = room["tally"][correct_code] if correct_code else 0
+    winners = []
+    if right:
+        answers = answer_row(room, row)
+        winners = [p for p in room["players"].values() if answers[p.index] == correct_code]
+
+    board_score(room, winners)
+
+    room["last_result"] = {
+        "right": right,
+        "wrong": len(room["players"]) - right
+    }
+
+    results = room["results"]
+    if not results or room["questions"][results[-1]].get("id") != room["current_question"].get("id"):
+        results.append(row)
+
+    return True
+
+
+# ================== TIMER-SCHEMALÄGGARE ==================
+
+import heapq
+
+
+class TimerScheduler:
+    """Låser svar och räknar poäng exakt vid timer["ends_at"].
+
+    En min-heap med (ends_at, room_code) och en asyncio-task som sover
+    till närmaste deadline. schedule() anropas från threadpool-endpoints
+    och väcker tasken om en tidigare deadline dyker upp. Inaktuella poster
+    (ny fråga, reset) ignoreras när de löser ut.
+    """
+
+    def __init__(self):
+        self.heap: list[tuple[float, str]] = []
+        self.lock = threading.Lock()
+        self.loop = None
+        self.wakeup = None
+        self.task = None
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        self.task = None
+        self.loop = None
+
+    def schedule(self, code: str, ends_at: float):
+        with self.lock:
+            heapq.heappush(self.heap, (ends_at, code))
+            is_next = self.heap[0] == (ends_at, code)
+
+        if is_next and self.loop is not None:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def pop_due(self, now: float) -> list[tuple[float, str]]:
+        due = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                due.append(heapq.heappop(self.heap))
+        return due
+
+    def next_deadline(self):
+        with self.lock:
+            return self.heap[0][0] if self.heap else None
+
+    async def run(self):
+        while True:
+            self.wakeup.clear()
+
+            for ends_at, code in self.pop_due(time.time()):
+                # Läser och skriver storen (BEGIN IMMEDIATE i SQLite) – i tråd
+                try:
+                    await asyncio.to_thread(self.fire, code, ends_at)
+                except Exception as e:
+                    # Ett trasigt rum får inte stoppa timrarna för alla andra
+                    print(f"[TIMER] {code} failed: {e!r}")
+
+            deadline = self.next_deadline()
+            timeout = None if deadline is None else max(0, deadline - time.time())
+
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def fire(self, code: str, ends_at: float):
+        room = ROOM_STORE.get(code)
+        if not room or not room.get("timer"):
+            return
+
+        # Frågan har bytts eller rummet nollställts sedan posten lades in
+        if room["timer"].get("ends_at") != ends_at:
+            return
+
+        # Väckt en aning för tidigt (klockjustering) → försök igen
+        if time.time() < ends_at:
+            self.schedule(code, ends_at)
+            return
+
+        if room.get("answers_locked"):
+            return
 
+        with ROOM_STORE.mutate(code) as room:
+            locked = room is not None and lock_and_score(room)
 
-def is_game_question(text: str) -> bool:
-    t = text.lower()
-    return any(k in t for k in GAME_KEYWORDS)
+        if locked:
+            ROOM_HUB.publish(code, "locked")
 
+    def resume(self):
+        # Frågor som pågick när processen startade (delad store / omstart)
+        for code in ROOM_STORE.codes():
+            room = ROOM_STORE.get(code)
+            if room and room.get("phase") == "question" and room.get("timer"):
+                self.schedule(code, room["timer"]["ends_at"])
 
-def looks_like_quote(text: str) -> bool:
-    return '"' in text or "'" in text or len(text.split()) > 6
 
-# ================== NORMALISERING ==================
+ROOM_TIMERS = TimerScheduler()
 
-def normalize_numbers(text: str) -> str:
-    if not text:
-        return text
 
-    replacements = {
-        r"Less than (\d+)\s*Thousand": r"Mindre än \1 000",
-        r"(\d+)\s*Thousand": r"\1 000",
-        r"(\d+)\s*Million": r"\1 miljon",
-    }
+# ================== LEADERBOARD (INKREMENTELL) ==================
+# room["board"] ändras bara när poäng ändras (join, lås, start/reset).
+# "scores" är de distinkta poängen i stigande ordning, "counts" antal
+# spelare per poäng och "above" antal spelare med högre poäng – plats
+# (1, 1, 3 …) slås upp med en bisect. "top" är en färdigsorterad
+# topplista, så scoreboard-läsningar inte sorterar något.
 
-    for pattern, repl in replacements.items():
-        text = re.sub(pattern, repl, text, flags=re.IGNORECASE)
+import bisect
+import threading
+import itertools
 
-    return text
+LEADERBOARD_TOP = int(os.getenv("LEADERBOARD_TOP", "50"))
+LEADERBOARD_ROOMS_MAX = 100  # rum per sammanlagd topplista
 
-# ================== ÖVERSÄTTNING ==================
 
-def deepl_translate(text: str) -> str:
-    if not DEEPL_KEY or not text:
-        return text
+def board_add(board, score: int, delta: int):
+    scores, counts = board["scores"], board["counts"]
+    i = bisect.bisect_left(scores, score)
 
-    if text in TRANSLATION_CACHE:
-        return TRANSLATION_CACHE[text]
+    if i < len(scores) and scores[i] == score:
+        counts[i] += delta
+        if counts[i] <= 0:
+            del scores[i]
+            del counts[i]
+    elif delta > 0:
+        scores.insert(i, score)
+        counts.insert(i, delta)
 
-    try:
-        r = requests.post(
-            DEEPL_URL,
-            data={
-                "auth_key": DEEPL_KEY,
-                "text": text,
-                "target_lang": "SV"
-            },
-            timeout=5
-        )
-        data = r.json()
-        translated = data["translations"][0]["text"]
-        TRANSLATION_CACHE[text] = translated
-        return translated
-    except Exception:
-        TRANSLATION_CACHE[text] = text
-        return text
 
+def board_refresh(room):
+    # O(distinkta poäng) + O(n log LEADERBOARD_TOP) – en gång per ändring
+    board = room["board"]
 
-def smart_translate(text: str) -> str:
-    if not text or len(text.strip()) < 2:
-        return text
+    above = []
+    total = 0
+    for count in reversed(board["counts"]):
+        above.append(total)
+        total += count
+    board["above"] = above[::-1]
 
-    if looks_like_name_or_title(text):
-        return text
+    # nlargest är stabil: lika poäng i join-ordning
+    top = heapq.nlargest(LEADERBOARD_TOP, room["players"].values(), key=lambda p: p.score)
+    board["top"] = [{"name": p.name, "score": p.score} for p in top]
 
-    translated = deepl_translate(text)
 
-    if translated == text:
-        return text
+def board_rebuild(room):
+    room["board"] = {"scores": [], "counts": [], "above": [], "top": []}
+    for p in room["players"].values():
+        board_add(room["board"], p.score, 1)
+    board_refresh(room)
+    return room["board"]
 
-    if length_diff_too_big(text, translated):
-        return text
 
-    return translated
+def room_board(room):
+    return room.get("board") or board_rebuild(room)
 
-# ================== V2 ROOM API ==================
 
-import time
-from fastapi import Body, HTTPException
+def board_score(room, players, points: int = 1):
+    """Ger players poäng och uppdaterar tavlan (anropas vid lås)."""
+    board = room_board(room)
+    for p in players:
+        board_add(board, p.score, -1)
+        p.score += points
+        board_add(board, p.score, 1)
+    board_refresh(room)
 
-def maybe_lock_answers(room_data):
-    timer = room_data.get("timer")
-    if not timer:
-        return
 
-    if room_data.get("answers_locked"):
-        return
+def board_all(room):
+    # Hela tavlan (TV:ns scoreboard) – topplistan räcker när alla får plats i den
+    top = room_board(room)["top"]
+    if len(top) == len(room["players"]):
+        return top
+    return sorted(
+        ({"name": p.name, "score": p.score} for p in room["players"].values()),
+        key=lambda p: p["score"],
+        reverse=True
+    )
 
-    ends_at = timer.get("ends_at")
-    if not ends_at:
-        return
 
-    now = time.time()
-    if now >= ends_at:
-        room_data["answers_locked"] = True
-        room_data["phase"] = "locked"
+def board_rank(room, score: int):
+    board = room_board(room)
+    i = bisect.bisect_left(board["scores"], score)
+    if i == len(board["scores"]) or board["scores"][i] != score:
+        return None
+    return board["above"][i] + 1
 
 
-@app.post("/room/create")
-def create_room(host_plays: bool = False):
-    code = generate_room_code()
+# ================== ROOM-VYER (PER ROLL) ==================
+# Klienter får aldrig hela ROOMS[code]: spelare ska inte se correct_letter
+# och ingen behöver hela svarshistoriken varje sekund. Historiken finns
+# sidad under /room/{code}/results.
 
-    ROOMS[code] = {
-        "code": code,
-        "host_plays": host_plays,
-        "players": {},
-        "started": False,
-        "current_question": None,
-        "difficulty": "medium",
-        "timer": None,
-        "phase": "idle",
-        "answers_locked": False,
-        "last_result": None,
-        "final_results": []
-    }
+VIEW_ROLES = {"tv", "host", "player"}
+RESULTS_PAGE_MAX = 100
+
+
+def question_summary(room):
+    q = room.get("current_question")
+    if not q:
+        return None
 
     return {
-        "roomCode": code,
-        "host_plays": host_plays
+        "id": q.get("id"),
+        "question": q.get("question"),
+        "category": q.get("category")
     }
 
-@app.post("/room/join")
-def join_room(room: str, name: str):
-    room_code = room.upper()
-    room_data = ROOMS.get(room_code)
 
-    if not room_data:
-        raise HTTPException(status_code=404, detail="Room not found")
+def current_answer(room, player):
+    if not room.get("current_question") or not player or not room["questions"]:
+        return None
+    return answer_of(room, player)
+
+
+def tv_view(room):
+    view = {
+        "code": room["code"],
+        "version": room.get("version", 0),
+        "started": room["started"],
+        "phase": room["phase"],
+        "host_ready": room.get("host_ready", False),
+        "answers_locked": room["answers_locked"],
+        "timer": room["timer"],
+        "current_question": question_summary(room),
+        "last_result": room["last_result"],
+        "player_count": len(room["players"]),
+        "answered": room_tally(room)["answered"],
+        "results_count": len(room["results"])
+    }
 
-    if room_data["started"]:
-        raise HTTPException(status_code=400, detail="Game already started")
+    if room["phase"] == "scoreboard":
+        view["scoreboard"] = board_all(room)
 
-    # Unika spelnamn (case-insensitive)
-    for p in room_data["players"].values():
-        if p["name"].lower() == name.lower():
-            raise HTTPException(status_code=400, detail="Name already taken")
+    return view
 
-    player_id = str(uuid.uuid4())[:8]
 
-    room_data["players"][player_id] = {
-        "id": player_id,
-        "name": name,
-        "score": 0,
-        "answers": []
-    }
+def host_view(room):
+    players = room["players"].values()
+    tally = room_tally(room)
 
     return {
-        "playerId": player_id,
-        "roomCode": room_code,
-        "name": name
+        "code": room["code"],
+        "version": room.get("version", 0),
+        "started": room["started"],
+        "phase": room["phase"],
+        "host_plays": room["host_plays"],
+        "host_ready": room.get("host_ready", False),
+        "answers_locked": room["answers_locked"],
+        "timer": room["timer"],
+        "current_question": question_summary(room),
+        "players": [
+            {"id": p.id, "name": p.name, "score": p.score}
+            for p in players
+        ],
+        "player_count": len(room["players"]),
+        "answered": tally["answered"],
+        "tally": tally["letters"]
     }
 
-@app.post("/room/start")
-def start_room(room: str, payload: dict = Body(default={})):
-    room_code = room.upper()
-    room_data = ROOMS.get(room_code)
 
-    if not room_data:
-        raise HTTPException(status_code=404, detail="Room not found")
+def player_view(room, player_id):
+    player = room["players"].get(player_id) if player_id else None
+    q = room.get("current_question")
+
+    view = {
+        "code": room["code"],
+        "version": room.get("version", 0),
+        "started": room["started"],
+        "phase": room["phase"],
+        "answers_locked": room["answers_locked"],
+        "question_id": q.get("id") if q else None,
+        "joined": player is not None,
+        "answer": current_answer(room, player),
+        "rank": None,
+        "player_count": len(room["players"])
+    }
 
-    room_data["started"] = True
-    room_data["difficulty"] = payload.get("difficulty", "medium")
+    if player and room["phase"] == "scoreboard":
+        view["rank"] = board_rank(room, player.score)
 
-    # ✅ SPARA VALD KATEGORI (DETTA VAR DET SOM SAKNADES)
-    room_data["category_name"] = payload.get("category", "Allmänbildning")
+    return view
 
-    # Nollställ spelstate
-    room_data["current_question"] = None
-    room_data["timer"] = None
-    room_data["phase"] = "idle"
-    room_data["answers_locked"] = False
 
-    # Nollställ spelardata
-    for player in room_data["players"].values():
-        player["answers"] = []
-        player["score"] = 0
+def room_view(room, role, player_id=None):
+    if role == "host":
+        return host_view(room)
+    if role == "player":
+        return player_view(room, player_id)
+    return tv_view(room)
 
-    return {"status": "started", "roomCode": room_code}
 
-@app.post("/room/question")
-def set_question(room: str, question: dict):
-    import json
-    import time
+ROOM_EPOCH = uuid.uuid4().hex[:8]  # ETags från en tidigare process matchar aldrig
+LONG_POLL_MAX = 30
 
-    room_code = room.upper()
-    room_data = ROOMS.get(room_code)
 
-    if not room_data:
-        raise HTTPException(status_code=404, detail="Room not found")
+class ViewCache:
+    """Färdigkodade vy-bodies per (room, roll, spelare) för en version.
 
-    # ===== KATEGORI =====
-    question["category"] = room_data.get("category_name", "Allmänbildning")
+    N klienter som pollar ett oförändrat rum kostar en serialisering;
+    en ny version ersätter posten vid nästa läsning.
+    """
 
-    # ===== STABILT FRÅGE-ID =====
-    if not question.get("id"):
-        canonical = json.dumps(
-            question,
-            sort_keys=True,
-            ensure_ascii=False,
-            separators=(",", ":")
-        )
-        question["id"] = hashlib.sha1(
-            canonical.encode("utf-8")
-        ).hexdigest()[:10]
+    def __init__(self):
+        self.rooms: dict[str, dict[tuple, tuple[int, bytes]]] = {}
+        # Spelar-id:n per rum för senast kodade version – cache_key utan att läsa rummet
+        self.players: dict[str, tuple[int, frozenset]] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
 
-    room_data["current_question"] = question
+    def key(self, code: str, version: int, role: str, player_id: str | None) -> tuple | None:
+        # Samma nyckel som cache_key(); None om spelarlistan för versionen är okänd
+        if player_id is None:
+            return role, None
+        members = self.players.get(code)
+        if members is None or members[0] != version:
+            return None
+        return role, player_id if player_id in members[1] else None
 
-    # ===== ANSWER-SLOTS (KRITISKT) =====
-    for player in room_data["players"].values():
-        player["answers"].append({
-            "question_id": question["id"],
-            "answer": None
-        })
+    def peek(self, code: str, view_key: tuple | None, version: int):
+        entry = self.rooms.get(code, {}).get(view_key)
+        return entry[1] if entry is not None and entry[0] == version else None
 
-    DIFFICULTY_SECONDS = {
-        "easy": 25,
-        "medium": 20,
-        "hard": 15
-    }
+    def get(self, code: str, view_key: tuple | None, version: int):
+        body = self.peek(code, view_key, version)
+        with self.lock:
+            if body is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return body
+
+    def put(self, code: str, view_key: tuple, version: int, body: bytes, players):
+        with self.lock:
+            self.rooms.setdefault(code, {})[view_key] = (version, body)
+            members = self.players.get(code)
+            if members is None or members[0] < version:
+                self.players[code] = (version, frozenset(players))
+
+    def drop(self, code: str):
+        with self.lock:
+            self.rooms.pop(code, None)
+            self.players.pop(code, None)
+
+
+VIEW_CACHE = ViewCache()
+
+
+def cache_key(room, role: str, player_id: str | None) -> tuple:
+    # Okända spelar-id:n får samma vy som ("player", None) – ingen post per id
+    if player_id is not None and player_id not in room["players"]:
+        player_id = None
+    return role, player_id
+
+
+def view_body(room, role: str, player_id: str | None = None) -> bytes:
+    # Anropas under rummets lås (ROOM_STORE.read)
+    code = room["code"]
+    version = room.get("version", 0)
+    view_key = cache_key(room, role, player_id)
+
+    body = VIEW_CACHE.get(code, view_key, version)
+    if body is None:
+        body = json_bytes(room_view(room, role, player_id))
+        VIEW_CACHE.put(code, view_key, version, body, room["players"])
+    return body
+
+
+def room_etag(code: str, version: int, role: str, player_id: str | None = None) -> str:
+    view_key = role if player_id is None else f"{role}:{player_id}"
+    return f'"{ROOM_EPOCH}-{code}-{version}-{view_key}"'
+
+
+def read_view(code: str, role: str, player_id: str | None) -> tuple[int, bytes]:
+    # Cache-miss: läs rummet och lägg den kodade vyn i VIEW_CACHE (missen är redan räknad)
+    with ROOM_STORE.read(code) as room:
+        if not room:
+            raise HTTPException(status_code=404, detail="Room not found")
+        version = room.get("version", 0)
+        view_key = cache_key(room, role, player_id)
+        body = VIEW_CACHE.peek(code, view_key, version)
+        if body is None:
+            body = json_bytes(room_view(room, role, player_id))
+            VIEW_CACHE.put(code, view_key, version, body, room["players"])
+    return version, body
+
+
+async def view_response(
+    request: Request,
+    code: str,
+    role: str,
+    player_id: str | None,
+    since: int | None,
+    wait: float
+):
+    code = code.upper()
 
-    difficulty = question.get("difficulty") or room_data.get("difficulty", "medium")
-    seconds = DIFFICULTY_SECONDS.get(difficulty, 20)
+    # LONG-POLL: håll requesten tills versionen ändras (max LONG_POLL_MAX s)
+    if since is not None and wait > 0:
+        await ROOM_HUB.wait_for_change(code, since, min(wait, LONG_POLL_MAX), role, player_id)
 
-    now = time.time()
-    room_data["timer"] = {"ends_at": now + seconds}
-    room_data["phase"] = "question"
-    room_data["answers_locked"] = False
+    version = await store_call(ROOM_STORE.version, code)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Room not found")
 
-    return {
-        "status": "question_set",
-        "roomCode": room_code,
-        "question_id": question["id"],
-        "difficulty": difficulty,
-        "seconds": seconds
-    }
+    ROOM_LIFECYCLE.touch(code)
+    etag = room_etag(code, version, role, player_id)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
 
-@app.post("/room/answer")
-def submit_answer(room: str, player_id: str, answer: str):
-    room_code = room.upper()
-    room_data = ROOMS.get(room_code)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
 
-    if not room_data:
-        raise HTTPException(status_code=404, detail="Room not found")
+    # Ren läsning – låsning sker i ROOM_TIMERS; rummet läses bara vid cache-miss
+    body = VIEW_CACHE.get(code, VIEW_CACHE.key(code, version, role, player_id), version)
+    if body is None:
+        version, body = await store_call(read_view, code, role, player_id)
+        headers["ETag"] = room_etag(code, version, role, player_id)
 
-    if room_data.get("answers_locked"):
-        raise HTTPException(status_code=400, detail="Answers are locked")
+    return Response(body, media_type="application/json", headers=headers)
 
-    if not room_data.get("current_question"):
-        raise HTTPException(status_code=400, detail="No active question")
 
-    player = room_data["players"].get(player_id)
-    if not player:
-        raise HTTPException(status_code=404, detail="Player not found")
+@app.get("/room/{code}")
+async def get_room(code: str, request: Request, since: int | None = None, wait: float = 0):
+    # Publik vy (samma som TV) – hela room-dicten lämnar aldrig servern
+    return await view_response(request, code, "tv", None, since, wait)
 
-    if answer not in ["A", "B", "C", "D"]:
-        raise HTTPException(status_code=400, detail="Invalid answer")
 
-    current_q = room_data["current_question"]
-    current_q_id = current_q.get("id")
+@app.get("/room/{code}/tv")
+async def get_room_tv(code: str, request: Request, since: int | None = None, wait: float = 0):
+    return await view_response(request, code, "tv", None, since, wait)
 
-    if not player["answers"]:
-        raise HTTPException(status_code=400, detail="Answer slot not initialized")
 
-    last_answer = player["answers"][-1]
+@app.get("/room/{code}/host")
+async def get_room_host(code: str, request: Request, since: int | None = None, wait: float = 0):
+    return await view_response(request, code, "host", None, since, wait)
 
-    if last_answer["question_id"] != current_q_id:
-        raise HTTPException(status_code=400, detail="Answer mismatch")
 
-    # tillåt byte av svar tills timer låser
-    last_answer["answer"] = answer
+@app.get("/room/{code}/player")
+async def get_room_anonymous_player(
+    code: str,
+    request: Request,
+    since: int | None = None,
+    wait: float = 0
+):
+    # Innan spelaren har gått med (join.html behöver "started")
+    return await view_response(request, code, "player", None, since, wait)
 
-    return {"status": "answer_received"}
 
-@app.get("/room/{code}")
-def get_room(code: str):
-    import time
+@app.get("/room/{code}/player/{player_id}")
+async def get_room_player(
+    code: str,
+    player_id: str,
+    request: Request,
+    since: int | None = None,
+    wait: float = 0
+):
+    return await view_response(request, code, "player", player_id, since, wait)
 
-    room = ROOMS.get(code.upper())
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
 
-    # AUTO-LOCK NÄR TIMER GÅTT UT
-    if room.get("timer") and not room.get("answers_locked") and room.get("phase") == "question":
-        ends_at = room["timer"].get("ends_at")
-        if ends_at and time.time() >= ends_at:
-            room["answers_locked"] = True
-            room["phase"] = "locked"
-
-            correct_letter = room["current_question"].get("correct_letter")
-            options = room["current_question"].get("options", {})
-            correct_text = options.get(correct_letter, "")
-
-            right = 0
-            wrong = 0
-            right_players = []
-            wrong_players = []
-
-            for p in room["players"].values():
-                ans_letter = p["answers"][-1]["answer"]
-                ans_text = options.get(ans_letter, "") if ans_letter else ""
-
-                entry = {
-                    "name": p["name"],
-                    "answer_letter": ans_letter,
-                    "answer_text": ans_text
-                }
-
-                if ans_letter == correct_letter:
-                    right += 1
-                    right_players.append(entry)
-                    p["score"] += 1
-                else:
-                    wrong += 1
-                    wrong_players.append(entry)
-
-            room["last_result"] = {
-                "right": right,
-                "wrong": wrong
-            }
+@app.get("/room/{code}/results")
+def get_room_results(code: str, offset: int = 0, limit: int = 20):
+    offset = max(offset, 0)
+    limit = min(max(limit, 1), RESULTS_PAGE_MAX)
 
-            if (
-                not room.get("final_results")
-                or room["final_results"][-1]["question_id"]
-                != room["current_question"].get("id")
-            ):
-                room["final_results"].append({
-                    "question_id": room["current_question"].get("id"),
-                    "question": room["current_question"].get("question"),
-                    "category": room["current_question"].get("category"),
-                    "correct_letter": correct_letter,
-                    "correct_text": correct_text,
-                    "right_players": right_players,
-                    "wrong_players": wrong_players
-                })
-
-    # ✅ RANKING ENDAST NÄR SCOREBOARD VISAS
-    if room.get("phase") == "scoreboard":
-        players = list(room["players"].items())
-        players.sort(key=lambda x: x[1]["score"], reverse=True)
-
-        ranks = {}
-        last_score = None
-        current_rank = 0
-
-        for index, (pid, p) in enumerate(players):
-            if p["score"] != last_score:
-                current_rank = index + 1
-                last_score = p["score"]
-            ranks[pid] = current_rank
-
-        room["player_ranks"] = ranks
-        room["player_count"] = len(players)
+    with ROOM_STORE.read(code.upper()) as room:
+        if not room:
+            raise HTTPException(status_code=404, detail="Room not found")
+        total = len(room["results"])
+        page = [result_entry(room, row) for row in room["results"][offset:offset + limit]]
 
-    return room
+    return {
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "results": page
+    }
+
+@app.get("/room/{code}/tally")
+def get_room_tally(code: str):
+    # "X av Y har svarat" + fördelning per bokstav, utan att läsa svaren
+    with ROOM_STORE.read(code.upper()) as room:
+        if not room:
+            raise HTTPException(status_code=404, detail="Room not found")
+        return room_tally(room)
 
 # ✅ EXPLICIT SCOREBOARD-TRIGGER (HOST / TV)
 @app.post("/room/scoreboard")
 def show_scoreboard(room: str):
     room_code = room.upper()
-    room_data = ROOMS.get(room_code)
+    with ROOM_STORE.mutate(room_code) as room_data:
+        if not room_data:
+            raise HTTPException(status_code=404, detail="Room not found")
 
-    if not room_data:
-        raise HTTPException(status_code=404, detail="Room not found")
+        # Tavlan är redan aktuell sedan senaste låsningen
+        room_data["phase"] = "scoreboard"
+        room_data["answers_locked"] = True
 
-    room_data["phase"] = "scoreboard"
-    room_data["answers_locked"] = True
+    ROOM_HUB.publish(room_code, "scoreboard")
 
     return {"status": "scoreboard", "roomCode": room_code}
 
-# ================== QR-KOD (SERVER-SIDE PNG) ==================
+# ✅ SAMMANLAGD TOPPLISTA (TURNERING ÖVER FLERA RUM)
+@app.get("/leaderboard")
+def get_leaderboard(rooms: str, limit: int = 20):
+    limit = min(max(limit, 1), LEADERBOARD_TOP)
+    codes = list(dict.fromkeys(c.strip().upper() for c in rooms.split(",") if c.strip()))
+
+    # Varje rums topp är redan sorterad → k-vägs merge av färdiga listor
+    tops = []
+    for code in codes[:LEADERBOARD_ROOMS_MAX]:
+        with ROOM_STORE.read(code) as room:
+            if room:
+                tops.append([{**e, "room": code} for e in room_board(room)["top"][:limit]])
+
+    merged = list(itertools.islice(
+        heapq.merge(*tops, key=lambda e: -e["score"]),
+        limit
+    ))
+
+    for index, entry in enumerate(merged):
+        if index and entry["score"] == merged[index - 1]["score"]:
+            entry["rank"] = merged[index - 1]["rank"]
+        else:
+            entry["rank"] = index + 1
+
+    return {"rooms": len(tops), "leaderboard": merged}
+
+# ================== QR-KOD (SERVER-SIDE PNG/SVG, CACHAD) ==================
 
 from fastapi import Request
 from fastapi.responses import Response, HTMLResponse
 from io import BytesIO
+from concurrent.futures import Future, ThreadPoolExecutor
 import qrcode
+import qrcode.image.svg
 
-def make_qr_png(target_url: str) -> Response:
-    img = qrcode.make(target_url)
+QR_CACHE_MAX = int(os.getenv("QR_CACHE_MAX", "512"))
+QR_CACHE_CONTROL = "public, max-age=86400"  # innehållet beror bara på URL:en
+
+QR_MEDIA_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml"
+}
+
+
+def render_qr(target_url: str, fmt: str) -> bytes:
+    if fmt == "svg":
+        img = qrcode.make(target_url, image_factory=qrcode.image.svg.SvgPathImage)
+    else:
+        img = qrcode.make(target_url)
     buf = BytesIO()
     img.save(buf)
-    buf.seek(0)
-    return Response(content=buf.getvalue(), media_type="image/png")
+    return buf.getvalue()
+
+
+class QRCache:
+    """LRU med färdigkodade QR-bilder per (format, mål-URL).
+
+    Samma bild genereras bara en gång även om flera requests kommer
+    samtidigt; prefetch() genererar i bakgrunden när ett room skapas.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: OrderedDict[tuple[str, str], tuple[bytes, str]] = OrderedDict()
+        self.pending: dict[tuple[str, str], Future] = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="qr")
+        self.lookups: dict[str, int] = defaultdict(int)  # hit / wait / render
+
+    def get(self, target_url: str, fmt: str = "png") -> tuple[bytes, str]:
+        key = (fmt, target_url)
+
+        with self.lock:
+            hit = self.entries.get(key)
+            if hit is not None:
+                self.entries.move_to_end(key)
+                self.lookups["hit"] += 1
+                return hit
+
+            future = self.pending.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.pending[key] = future
+            self.lookups["render" if owner else "wait"] += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            body = render_qr(target_url, fmt)
+            entry = (body, '"' + hashlib.sha1(body).hexdigest()[:20] + '"')
+        except Exception as e:
+            with self.lock:
+                self.pending.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            self.entries[key] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.pending.pop(key, None)
+
+        future.set_result(entry)
+        return entry
+
+    def prefetch(self, target_url: str, fmt: str = "png"):
+        with self.lock:
+            if (fmt, target_url) in self.entries:
+                return
+        self.executor.submit(self.get, target_url, fmt)
+
+
+QR_CACHE = QRCache(QR_CACHE_MAX)
+
+
+def qr_targets(request: Request, room: str) -> dict[str, str]:
+    base = str(request.base_url).rstrip("/")
+    return {
+        "host": f"{base}/static/host_entry.html?room={room}",
+        "player": f"{base}/static/join.html?room={room}"
+    }
+
+
+def prefetch_room_qr(request: Request, room: str):
+    # TV:n visar SVG, host.html PNG – generera allt innan någon frågar
+    for target_url in qr_targets(request, room).values():
+        for fmt in QR_MEDIA_TYPES:
+            QR_CACHE.prefetch(target_url, fmt)
+
+
+def qr_response(request: Request, room: str, target: str, fmt: str) -> Response:
+    target_url = qr_targets(request, room.upper())[target]
+    body, etag = QR_CACHE.get(target_url, fmt)
+    headers = {"ETag": etag, "Cache-Control": QR_CACHE_CONTROL}
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type=QR_MEDIA_TYPES[fmt], headers=headers)
 
 @app.get("/qr/{room}/host.png")
 def get_host_qr(room: str, request: Request):
-    room = room.upper()
-    base = str(request.base_url).rstrip("/")
-    target_url = f"{base}/static/host_entry.html?room={room}"
-    return make_qr_png(target_url)
+    return qr_response(request, room, "host", "png")
 
 @app.get("/qr/{room}/player.png")
 def get_player_qr(room: str, request: Request):
-    room = room.upper()
-    base = str(request.base_url).rstrip("/")
-    target_url = f"{base}/static/join.html?room={room}"
-    return make_qr_png(target_url)
+    return qr_response(request, room, "player", "png")
+
+@app.get("/qr/{room}/host.svg")
+def get_host_qr_svg(room: str, request: Request):
+    return qr_response(request, room, "host", "svg")
+
+@app.get("/qr/{room}/player.svg")
+def get_player_qr_svg(room: str, request: Request):
+    return qr_response(request, room, "player", "svg")
 
 # ================== HOST READY (ORÖRD) ==================
 
@@ -512,13 +2780,14 @@ from fastapi import Body
 @app.post("/room/host_ready")
 def set_host_ready(room: str, payload: dict = Body(default={})):
     room_code = room.upper()
-    room_data = ROOMS.get(room_code)
+    with ROOM_STORE.mutate(room_code) as room_data:
+        if not room_data:
+            raise HTTPException(status_code=404, detail="Room not found")
 
-    if not room_data:
-        raise HTTPException(status_code=404, detail="Room not found")
+        room_data["host_plays"] = bool(payload.get("host_plays", False))
+        room_data["host_ready"] = True   # 🔑 SIGNAL TILL TV
 
-    room_data["host_plays"] = bool(payload.get("host_plays", False))
-    room_data["host_ready"] = True   # 🔑 SIGNAL TILL TV
+    ROOM_HUB.publish(room_code, "host_ready")
 
     return {"status": "ok", "roomCode": room_code, "host_ready": True}
 
@@ -527,31 +2796,105 @@ def set_host_ready(room: str, payload: dict = Body(default={})):
 @app.post("/room/reset")
 def reset_room(room: str):
     room_code = room.upper()
-    room_data = ROOMS.get(room_code)
-
-    if not room_data:
-        raise HTTPException(status_code=404, detail="Room not found")
+    with ROOM_STORE.mutate(room_code) as room_data:
+        if not room_data:
+            raise HTTPException(status_code=404, detail="Room not found")
 
-    room_data["started"] = False
-    room_data["current_question"] = None
-    room_data["timer"] = None
-    room_data["phase"] = "idle"
-    room_data["answers_locked"] = False
-    room_data["last_result"] = None
-    room_data["final_results"] = []
-    room_data["host_ready"] = False
+        room_data["started"] = False
+        room_data["current_question"] = None
+        room_data["timer"] = None
+        room_data["phase"] = "idle"
+        room_data["answers_locked"] = False
+        room_data["last_result"] = None
+        room_clear_answers(room_data)
+        room_data["host_ready"] = False
 
-    room_data.pop("player_ranks", None)
-    room_data.pop("player_count", None)
+        room_data["difficulty"] = None
 
-    room_data["difficulty"] = None
+        for player in room_data["players"].values():
+            player.score = 0
+        board_rebuild(room_data)
 
-    for player in room_data["players"].values():
-        player["answers"] = []
-        player["score"] = 0
+    ROOM_HUB.publish(room_code, "reset")
 
     return {"status": "reset", "roomCode": room_code}
 
+# ================== HTML-MALLAR (KOMPILERADE) ==================
+# Sidorna läses och delas upp vid {{PLATSHÅLLARE}} en gång; render() bara
+# fogar ihop färdigkodade bytes-bitar. FESTQUIZ_DEV=1 laddar om filer vars
+# mtime ändrats, annars är mallarna frysta efter första laddningen.
+
+TEMPLATE_RELOAD = os.getenv("FESTQUIZ_DEV") == "1"
+PLACEHOLDER_RE = re.compile(r"\{\{([A-Z_]+)\}\}")
+
+
+class Template:
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime
+        with open(path, "r", encoding="utf-8") as f:
+            parts = PLACEHOLDER_RE.split(f.read())
+
+        # Udda index är platshållarnamn, jämna är text mellan dem
+        self.literals = [p.encode("utf-8") for p in parts[0::2]]
+        self.names = parts[1::2]
+
+    def render(self, **values: str) -> bytes:
+        out = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            value = values.get(name)
+            if value is None:
+                out.append(b"{{" + name.encode("utf-8") + b"}}")
+            else:
+                # Värden kan komma från URL:en (?room=) – escapa alltid
+                out.append(html.escape(str(value)).encode("utf-8"))
+            out.append(literal)
+        return b"".join(out)
+
+
+class TemplateCache:
+    def __init__(self, base_dir: str, reload: bool):
+        self.base_dir = base_dir
+        self.reload = reload
+        self.templates: dict[str, Template | None] = {}
+        self.lock = threading.Lock()
+
+    def get(self, name: str) -> Template | None:
+        path = os.path.join(self.base_dir, name)
+
+        with self.lock:
+            if name in self.templates:
+                template = self.templates[name]
+                if not self.reload:
+                    return template
+                try:
+                    if template is not None and os.stat(path).st_mtime == template.mtime:
+                        return template
+                except FileNotFoundError:
+                    pass
+
+            try:
+                template = Template(path)
+            except FileNotFoundError:
+                template = None
+
+            self.templates[name] = template
+            return template
+
+
+TEMPLATES = TemplateCache(BASE_DIR, TEMPLATE_RELOAD)
+
+
+def render_page(name: str, **values: str) -> Response:
+    template = TEMPLATES.get(name)
+    if template is None:
+        raise HTTPException(status_code=404, detail=f"{name} not found")
+
+    return Response(
+        content=template.render(**values),
+        media_type="text/html; charset=utf-8"
+    )
+
 # ================== TV START (MINIMAL ÄNDRING) ==================
 
 from fastapi.responses import RedirectResponse
@@ -562,56 +2905,30 @@ def serve_start(request: Request):
 
     if not room:
         code = generate_room_code()
-        ROOMS[code] = {
-            "code": code,
-            "host_plays": False,
-            "players": {},
-            "started": False,
-            "current_question": None,
-            "difficulty": "medium",
-            "timer": None,
-            "phase": "idle",
-            "answers_locked": False,
-            "last_result": None,
-            "final_results": [],
-            "host_ready": False
-        }
+        new_room(code)
+        prefetch_room_qr(request, code)
+
         # 🔒 LÅS TV:N TILL ROOM VIA URL
         return RedirectResponse(url=f"/?room={code}")
 
     code = room.upper()
 
-    if code not in ROOMS:
-        ROOMS[code] = {
-            "code": code,
-            "host_plays": False,
-            "players": {},
-            "started": False,
-            "current_question": None,
-            "difficulty": "medium",
-            "timer": None,
-            "phase": "idle",
-            "answers_locked": False,
-            "last_result": None,
-            "final_results": [],
-            "host_ready": False
-        }
-
-    with open(os.path.join(BASE_DIR, "start.html"), "r", encoding="utf-8") as f:
-        html = f.read()
+    if not ROOM_STORE.exists(code):
+        new_room(code)
+        prefetch_room_qr(request, code)
+    else:
+        ROOM_LIFECYCLE.touch(code)
 
     base = str(request.base_url).rstrip("/")
 
-    html = html.replace(
-        "{{JOIN_QR_SRC}}",
-        f"{base}/qr/{code}/player.png"
-    ).replace(
-        "{{HOST_QR_SRC}}",
-        f"{base}/qr/{code}/host.png"
+    # SVG skalar skarpt på stora TV-skärmar
+    return render_page(
+        "start.html",
+        JOIN_QR_SRC=f"{base}/qr/{code}/player.svg",
+        HOST_QR_SRC=f"{base}/qr/{code}/host.svg",
+        ROOM_CODE=code
     )
 
-    return html
-
 @app.get("/start.html")
 def serve_start_html():
     return FileResponse(os.path.join(BASE_DIR, "start.html"))
@@ -619,23 +2936,12 @@ def serve_start_html():
 # ================== HOST ENTRY (ORÖRD) ==================
 
 @app.get("/host")
-def host_entry():
+def host_entry(request: Request):
     code = generate_room_code()
 
-    ROOMS[code] = {
-        "code": code,
-        "host_plays": False,
-        "players": {},
-        "started": False,
-        "current_question": None,
-        "difficulty": "medium",
-        "timer": None,
-        "phase": "idle",
-        "answers_locked": False,
-        "last_result": None,
-        "final_results": [],
-        "host_ready": False
-    }
+    new_room(code)
+
+    prefetch_room_qr(request, code)
 
     return RedirectResponse(url=f"/static/host_entry.html?room={code}")
 
@@ -644,7 +2950,7 @@ from fastapi.responses import HTMLResponse
 @app.get("/tv_test")
 def tv_test(room: str):
     room = room.upper()
-    data = ROOMS.get(room)
+    data = ROOM_STORE.get(room)
     if not data:
         return HTMLResponse("NO ROOM")
 
@@ -656,142 +2962,797 @@ def tv_test(room: str):
     else:
         scene = "game"
 
-    with open(os.path.join(BASE_DIR, "tv_test.html"), "r", encoding="utf-8") as f:
-        html = f.read()
-
-    return HTMLResponse(html.replace("{{SCENE}}", scene or "host"))
+    return render_page("tv_test.html", SCENE=scene or "host")
 
 # ================== API ==================
 
-@app.get("/quiz")
-def quiz(
-    amount: int = 10,
-    category: str = "",
-    difficulty: str = ""
-):
-    API_MAX = 50
-    url = f"https://opentdb.com/api.php?amount={amount}&type=multiple"
+async def prepare_questions(api_questions: list[dict]) -> list[dict]:
+    """Översätter och normaliserar råfrågor (OpenTDB-format) i ett batch-anrop."""
+    raw = [
+        (
+            html.unescape(q["question"]),
+            html.unescape(q["correct_answer"]),
+            [html.unescape(a) for a in q["incorrect_answers"]]
+        )
+        for q in api_questions
+    ]
+    # Spel- och mediefrågor behåller svaren på originalspråk
+    kinds = classify_questions([question for question, _, _ in raw])
+
+    # Samla alla strängar i omgången → ett batch-anrop i stället för ~5 per fråga
+    texts = []
+    answers = []
+    for (question, correct, incorrect), kind in zip(raw, kinds):
+        texts.append(question)
+        if kind is None:
+            answers.extend(a for a in (correct, *incorrect) if not looks_like_quote(a))
+    texts.extend(answers)
+
+    translations = dict(zip(texts, await smart_translate_batch(texts)))
+    normalized = dict(zip(answers, normalize_numbers_batch([translations.get(a, a) for a in answers])))
+
+    return [
+        {
+            "question": translations.get(question, question),
+            "correct_answer": correct if kind else normalized.get(correct, correct),
+            "incorrect_answers": [a if kind else normalized.get(a, a) for a in incorrect]
+        }
+        for (question, correct, incorrect), kind in zip(raw, kinds)
+    ]
+
+
+# ================== HÄMTNING (OPENTDB + THE TRIVIA API, HEDGAD) ==================
+# Båda källorna frågas samtidigt under en gemensam deadline. Varje källa
+# hämtar, normaliserar och översätter sin omgång; svaren dedupas i den
+# ordning de blir klara, och när `amount` unika frågor finns avbryts den
+# långsammare. Mängden som begärs räknas upp med den dedup-förlust som
+# QUIZ_QUESTIONS har sett hittills. Mer än API_MAX delas upp i sidor som
+# hämtas parallellt men släpps igenom OpenTDB:s rate limit en i taget.
+
+import math
+
+API_MAX = 50  # OpenTDB:s och the-trivia-api:s max per anrop
+QUIZ_FETCH_DEADLINE = float(os.getenv("QUIZ_FETCH_DEADLINE", "12"))
+OVERFETCH_MIN = 1.25
+OVERFETCH_MAX = 4.0
+
+# OpenTDB-kategori (id) → the-trivia-api-kategori; saknas den frågas bara OpenTDB
+TRIVIA_API_CATEGORIES = {
+    "9": "general_knowledge",
+    "11": "film_and_tv",
+    "12": "music",
+    "14": "film_and_tv",
+    "17": "science",
+    "21": "sport_and_leisure",
+    "22": "geography",
+    "23": "history",
+}
+
+
+def overfetch(amount: int) -> int:
+    """Hur många frågor som ska begäras för att `amount` ska överleva dedup."""
+    fetched = QUIZ_QUESTIONS.values.get(("fetched",), 0)
+    skipped = QUIZ_QUESTIONS.values.get(("dedup_skipped",), 0)
+    loss = skipped / fetched if fetched else 0.0
+    factor = min(max(1 / max(1 - loss, 1 / OVERFETCH_MAX), OVERFETCH_MIN), OVERFETCH_MAX)
+    return math.ceil(amount * factor)
+
+
+def pages(amount: int) -> list[int]:
+    full, rest = divmod(amount, API_MAX)
+    return [API_MAX] * full + ([rest] if rest else [])
+
+
+# ================== OPENTDB: SESSION-TOKENS & RATE LIMIT ==================
+# OpenTDB släpper ett anrop per 5 s och IP och kan, med ett session-token,
+# låta bli att upprepa frågor. Ett token per pool-nyckel (kategori,
+# svårighet) – det är där hämtningen sker; rummens egna upprepningar tas
+# av room-scopet i QUESTION_INDEX. Slut på frågor (kod 4) ger en reset.
+
+OPENTDB_INTERVAL = float(os.getenv("OPENTDB_INTERVAL", "5"))
+
+OPENTDB_OK = 0
+OPENTDB_NO_RESULTS = 1
+OPENTDB_TOKEN_NOT_FOUND = 3
+OPENTDB_TOKEN_EMPTY = 4
+OPENTDB_RATE_LIMIT = 5
+
+
+class RateLimit:
+    """Minst `interval` sekunder mellan anrop (per worker)."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.last = float("-inf")
+        self.loop = None
+        self.lock = None
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop, self.lock = loop, asyncio.Lock()
+
+        # Låset hålls under väntan – en avbruten väntare lämnar ingen lucka
+        async with self.lock:
+            delay = self.last + self.interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.last = loop.time()
+
+
+OPENTDB_LIMIT = RateLimit(OPENTDB_INTERVAL)
+
+
+async def opentdb_call(url: str) -> dict:
+    await OPENTDB_LIMIT.wait()
+    data = await OPENTDB.get_json(url)
+    OPENTDB_RESPONSES.inc(str(data.get("response_code", OPENTDB_OK)))
+    return data
+
+
+class OpenTDBSessions:
+    """Session-token per (category, difficulty); request/reset är single-flight."""
+
+    def __init__(self):
+        self.tokens: dict[tuple[str, str], str] = {}
+        # Skilda kartor – token() får aldrig vänta på en reset (som inte ger något token)
+        self.requests: dict[tuple[str, str], asyncio.Task] = {}
+        self.resets: dict[tuple[str, str], asyncio.Task] = {}
+
+    @staticmethod
+    async def _single(pending: dict, key: tuple[str, str], make):
+        task = pending.get(key)
+        if task is None or task.done():
+            task = asyncio.create_task(make())
+            pending[key] = task
+        return await asyncio.shield(task)
+
+    async def token(self, key: tuple[str, str]) -> str:
+        token = self.tokens.get(key)
+        if token:
+            return token
+
+        async def request():
+            data = await opentdb_call(f"{OPENTDB_TOKEN_URL}?command=request")
+            if data.get("response_code") != OPENTDB_OK or not data.get("token"):
+                raise UpstreamError(f"opentdb token request failed: {data.get('response_code')}")
+            self.tokens[key] = data["token"]
+            return data["token"]
+
+        return await self._single(self.requests, key, request)
+
+    async def reset(self, key: tuple[str, str], token: str):
+        async def reset():
+            # En annan sida kan redan ha återställt eller bytt tokenet
+            if self.tokens.get(key) != token:
+                return
+            data = await opentdb_call(f"{OPENTDB_TOKEN_URL}?command=reset&token={token}")
+            if data.get("response_code") != OPENTDB_OK:
+                self.drop(key, token)
+
+        await self._single(self.resets, key, reset)
+
+    def drop(self, key: tuple[str, str], token: str):
+        if self.tokens.get(key) == token:
+            del self.tokens[key]
+
+
+OPENTDB_SESSIONS = OpenTDBSessions()
+
+
+async def fetch_opentdb(amount: int, category: str, difficulty: str) -> list[dict]:
+    key = (category, difficulty)
+    code = None
+    attempts = 0
+
+    # Ett återhämtningssteg per försök: nytt token, reset eller ny lucka.
+    # Halvering vid kod 1 räknas inte – den tar slut av sig själv vid amount 1
+    while attempts < 3:
+        token = await OPENTDB_SESSIONS.token(key)
+        url = f"{OPENTDB_URL}?amount={amount}&type=multiple&token={token}"
+
+        if category:
+            url += f"&category={category}"
+
+        if difficulty:
+            url += f"&difficulty={difficulty}"
+
+        data = await opentdb_call(url)
+        code = data.get("response_code", OPENTDB_OK)
+
+        if code == OPENTDB_OK:
+            return data.get("results", [])
+        if code == OPENTDB_TOKEN_NOT_FOUND:
+            OPENTDB_SESSIONS.drop(key, token)
+        elif code == OPENTDB_TOKEN_EMPTY:
+            await OPENTDB_SESSIONS.reset(key, token)
+        elif code == OPENTDB_NO_RESULTS:
+            # Färre frågor kvar än vi bad om – be om färre; tokenet behålls så
+            # att OpenTDB fortsätter dedupa (tomt token ger kod 4 och reset)
+            if amount == 1:
+                return []
+            amount = max(amount // 2, 1)
+            continue
+        elif code != OPENTDB_RATE_LIMIT:
+            break
+        attempts += 1
+
+    raise UpstreamError(f"opentdb response_code {code}")
+
+
+async def fetch_trivia_api(amount: int, category: str, difficulty: str) -> list[dict]:
+    url = f"{TRIVIA_API_URL}?limit={amount}"
 
     if category:
-        url += f"&category={category}"
+        url += f"&categories={TRIVIA_API_CATEGORIES[category]}"
 
     if difficulty:
         url += f"&difficulty={difficulty}"
 
-    questions = []
-    skipped_dedup = 0
-    fetched_total = 0
+    data = await TRIVIA_API.get_json(url)
 
-    # ================== OPEN TDB ==================
-    data = requests.get(url).json()
-    api_questions = data.get("results", [])
-    random.shuffle(api_questions)
+    # Samma form som OpenTDB; bara frågor med fyra alternativ
+    questions = []
+    for q in data:
+        text = q.get("question", "")
+        if isinstance(text, dict):
+            text = text.get("text", "")
+        incorrect = q.get("incorrectAnswers", [])
+        if text and q.get("correctAnswer") and len(incorrect) == 3:
+            questions.append({
+                "question": text,
+                "correct_answer": q["correctAnswer"],
+                "incorrect_answers": incorrect
+            })
+    return questions
 
-    def handle_question(q):
-        nonlocal skipped_dedup, fetched_total
 
-        fetched_total += 1
+async def fetch_questions(
+    amount: int = 10,
+    category: str = "",
+    difficulty: str = ""
+):
+    """Hämtar, översätter och dedupar frågor från båda upstreams (hedgat)."""
+    questions = []
+    skipped_dedup = 0
+    fetched_total = 0
+    category_scope = f"category:{category or 'unknown'}"
+    wanted = overfetch(amount)
 
-        raw_question = html.unescape(q["question"])
-        raw_correct = html.unescape(q["correct_answer"])
-        raw_incorrect = [html.unescape(a) for a in q["incorrect_answers"]]
+    async def source(fetch, count):
+        api_questions = await fetch(count, category, difficulty)
+        random.shuffle(api_questions)
+        return await prepare_questions(api_questions)
 
-        question_text = smart_translate(raw_question)
+    # En task per OpenTDB-sida; the-trivia-api tar max API_MAX per anrop
+    sources = [(fetch_opentdb, count) for count in pages(wanted)]
+    if not category or category in TRIVIA_API_CATEGORIES:
+        sources.append((fetch_trivia_api, min(wanted, API_MAX)))
 
-        if is_game_question(raw_question):
-            correct = raw_correct
-            incorrect = raw_incorrect
-        elif is_media_question(raw_question):
-            correct = raw_correct
-            incorrect = raw_incorrect
-        else:
-            if looks_like_quote(raw_correct):
-                correct = raw_correct
-            else:
-                correct = normalize_numbers(smart_translate(raw_correct))
-
-            incorrect = []
-            for a in raw_incorrect:
-                if looks_like_quote(a):
-                    incorrect.append(a)
-                else:
-                    incorrect.append(normalize_numbers(smart_translate(a)))
-
-        q_hash = question_hash(question_text, {
-            "correct": correct,
-            **{f"i{i}": v for i, v in enumerate(incorrect)}
-        })
+    pending = {asyncio.create_task(source(fetch, count)) for fetch, count in sources}
+    deadline = asyncio.get_running_loop().time() + QUIZ_FETCH_DEADLINE
+    error = None
 
-        if q_hash in seen_questions:
-            skipped_dedup += 1
-            return
+    try:
+        while pending and len(questions) < amount:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                try:
+                    prepared = task.result()
+                except Exception as e:
+                    # Trasigt svar (ej JSON, saknade fält) räknas som att källan föll bort
+                    error = e
+                    continue
+
+                for question in prepared:
+                    if len(questions) >= amount:
+                        break
+
+                    fetched_total += 1
+                    q_hash = question_key(question)
+
+                    if QUESTION_INDEX.seen(q_hash, category_scope):
+                        skipped_dedup += 1
+                        continue
+
+                    QUESTION_INDEX.add(q_hash, category_scope)
+                    questions.append(question)
+    finally:
+        # Den långsammare källan (eller båda vid deadline) behövs inte längre
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    QUIZ_QUESTIONS.inc("fetched", amount=fetched_total)
+    QUIZ_QUESTIONS.inc("dedup_skipped", amount=skipped_dedup)
+    QUIZ_QUESTIONS.inc("returned", amount=len(questions))
+
+    if not questions and error is not None:
+        raise error
+    return questions
 
-        seen_questions.append(q_hash)
-        seen_by_category[category or "unknown"].append(q_hash)
+# ================== FRÅGEBANK (SQLITE) ==================
+# Primär källa för /quiz: färdigöversatta, normaliserade frågor på disk,
+# indexerade på (kategori, svårighet, slumpnyckel). Upstream fyller bara
+# på – allt som hämtas skördas in i banken – och import_questions.py
+# lägger in hela dumpar.
 
-        questions.append({
-            "question": question_text,
-            "correct_answer": correct,
-            "incorrect_answers": incorrect
-        })
+QUESTION_BANK_DB = os.getenv(
+    "QUESTION_BANK_DB",
+    os.path.join(DATA_DIR, "questions.sqlite3")
+)
+# Under så här många frågor per (kategori, svårighet) skördas upstream
+QUESTION_BANK_TARGET = int(os.getenv("QUESTION_BANK_TARGET", "500"))
+QUESTION_BANK_MMAP = 64 * 1024 * 1024
+
+RND_MAX = 2 ** 62
+
+
+class QuestionBank:
+    """SQLite-bank med frågor per (category, difficulty).
+
+    Tom kategori/svårighet i sample() betyder "alla". Varje rad har en
+    slumpnyckel rnd; ett urval är en indexerad rnd-intervallskanning från
+    en slumpad startpunkt, så det tar mikrosekunder även med stora banker.
+    Utan open() är banken tom och allt går till upstream som förut.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = None
+        self.counts: dict[str, int] = defaultdict(int)  # sampled / harvested
+
+    def open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(f"PRAGMA mmap_size={QUESTION_BANK_MMAP}")
+        db.executescript(
+            "CREATE TABLE IF NOT EXISTS questions ("
+            "hash TEXT PRIMARY KEY, category TEXT NOT NULL, difficulty TEXT NOT NULL, "
+            "question TEXT NOT NULL, correct_answer TEXT NOT NULL, "
+            "incorrect_answers TEXT NOT NULL, rnd INTEGER NOT NULL, added_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS questions_key ON questions (category, difficulty, rnd);"
+            "CREATE INDEX IF NOT EXISTS questions_category ON questions (category, rnd);"
+            "CREATE INDEX IF NOT EXISTS questions_difficulty ON questions (difficulty, rnd);"
+            "CREATE INDEX IF NOT EXISTS questions_rnd ON questions (rnd);"
+        )
+        db.commit()
+
+        with self.lock:
+            self.db = db
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+    @staticmethod
+    def _where(category: str, difficulty: str) -> tuple[str, list]:
+        clauses, params = [], []
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        if difficulty:
+            clauses.append("difficulty = ?")
+            params.append(difficulty)
+        return "".join(f"{c} AND " for c in clauses), params
+
+    def add_many(self, questions, category: str = "", difficulty: str = "") -> int:
+        """Lägger in frågor (dubbletter på question_key ignoreras); returnerar antal nya."""
+        now = time.time()
+        rows = [
+            (
+                question_key(q), category, difficulty,
+                q["question"], q["correct_answer"], json.dumps(q["incorrect_answers"], ensure_ascii=False),
+                random.randrange(RND_MAX), now
+            )
+            for q in questions
+        ]
+
+        with self.lock:
+            if self.db is None or not rows:
+                return 0
+            before = self.db.total_changes
+            self.db.executemany(
+                "INSERT OR IGNORE INTO questions "
+                "(hash, category, difficulty, question, correct_answer, incorrect_answers, rnd, added_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.db.commit()
+            added = self.db.total_changes - before
+            self.counts["harvested"] += added
+            return added
+
+    def sample(self, category: str, difficulty: str, amount: int) -> list[dict]:
+        where, params = self._where(category, difficulty)
+        start = random.randrange(RND_MAX)
+
+        with self.lock:
+            if self.db is None or amount <= 0:
+                return []
+            rows = self.db.execute(
+                f"SELECT question, correct_answer, incorrect_answers FROM questions "
+                f"WHERE {where}rnd >= ? ORDER BY rnd LIMIT ?",
+                (*params, start, amount)
+            ).fetchall()
+            if len(rows) < amount:
+                # Slå runt till början av rnd-intervallet
+                rows += self.db.execute(
+                    f"SELECT question, correct_answer, incorrect_answers FROM questions "
+                    f"WHERE {where}rnd < ? ORDER BY rnd LIMIT ?",
+                    (*params, start, amount - len(rows))
+                ).fetchall()
+            self.counts["sampled"] += len(rows)
+
+        questions = [
+            {
+                "question": question,
+                "correct_answer": correct,
+                "incorrect_answers": json.loads(incorrect)
+            }
+            for question, correct, incorrect in rows
+        ]
+        random.shuffle(questions)
+        return questions
+
+    def count(self, category: str = "", difficulty: str = "") -> int:
+        where, params = self._where(category, difficulty)
+        with self.lock:
+            if self.db is None:
+                return 0
+            return self.db.execute(
+                f"SELECT COUNT(*) FROM questions WHERE {where}1", params
+            ).fetchone()[0]
+
+
+QUESTION_BANK = QuestionBank(QUESTION_BANK_DB)
+
+# ================== FRÅGEPOOL (BAKGRUND) ==================
+# /quiz ska aldrig vänta på OpenTDB/DeepL. Per (kategori, svårighet) hålls
+# färdigöversatta, deduppade frågor redo i minnet. Poolen fylls i första
+# hand från frågebanken och i andra hand från upstream, i bakgrunden när
+# den går under low-water.
+
+POOL_TARGET = int(os.getenv("QUIZ_POOL_TARGET", "40"))
+POOL_LOW_WATER = int(os.getenv("QUIZ_POOL_LOW_WATER", "15"))
+
+# "kategori:svårighet" kommaseparerat, t.ex. ":,9:easy" ("" = alla/blandad)
+POOL_WARM_KEYS = [
+    tuple((k.split(":", 1) + [""])[:2])
+    for k in os.getenv("QUIZ_POOL_WARM", ":").split(",")
+    if k.strip()
+]
 
-    for q in api_questions:
-        handle_question(q)
-        if len(questions) >= amount:
-            break
 
-    return questions
+class QuestionPool:
+    """Bakgrundspool med färdiga frågor per (category, difficulty).
+
+    Påfyllning körs som en task per nyckel (single-flight). Den tar först
+    ur QUESTION_BANK; upstream anropas för det som saknas och – så länge
+    banken har färre än QUESTION_BANK_TARGET frågor för nyckeln – en gång
+    till för att skörda nya frågor till banken.
+    """
+
+    def __init__(self, target: int, low_water: int):
+        self.target = target
+        self.low_water = low_water
+        self.pools: dict[tuple[str, str], deque] = defaultdict(deque)
+        self.refills: dict[tuple[str, str], asyncio.Task] = {}
+
+    def size(self, category: str, difficulty: str) -> int:
+        return len(self.pools.get((category, difficulty), ()))
+
+    def refill(self, key: tuple[str, str], minimum: int = 0) -> asyncio.Task:
+        task = self.refills.get(key)
+        if task is None or task.done():
+            task = asyncio.create_task(self._refill(key, minimum))
+            self.refills[key] = task
+        return task
+
+    def add(self, key: tuple[str, str], questions) -> int:
+        """Lägger frågor sist i poolen utom de som redan ligger där; returnerar antal nya."""
+        pool = self.pools[key]
+        present = {question_key(q) for q in pool}
+        added = 0
+        for question in questions:
+            q_hash = question_key(question)
+            if q_hash not in present:
+                present.add(q_hash)
+                pool.append(question)
+                added += 1
+        return added
+
+    def top_up(self, key: tuple[str, str], minimum: int = 0) -> int:
+        """Fyller poolen från banken (synkront, mikrosekunder); returnerar vad som saknas."""
+        wanted = max(self.target, minimum) - len(self.pools[key])
+        if wanted > 0:
+            # Urvalen överlappar – det som redan ligger i poolen räknas inte
+            wanted -= self.add(key, QUESTION_BANK.sample(*key, wanted))
+        return wanted
+
+    async def _refill(self, key: tuple[str, str], minimum: int):
+        category, difficulty = key
+        wanted = self.top_up(key, minimum)
 
-    # ================== THE TRIVIA API (FALLBACK) ==================
-    if len(questions) < amount:
         try:
-            trivia_url = f"https://the-trivia-api.com/api/questions?limit={API_MAX}"
-            if difficulty:
-                trivia_url += f"&difficulty={difficulty}"
-
-            trivia_data = requests.get(trivia_url, timeout=5).json()
-            random.shuffle(trivia_data)
-
-            for q in trivia_data:
-                mapped = {
-                    "question": q.get("question", ""),
-                    "correct_answer": q.get("correctAnswer", ""),
-                    "incorrect_answers": q.get("incorrectAnswers", [])
-                }
-                handle_question(mapped)
-                if len(questions) >= amount:
+            harvest = await asyncio.to_thread(QUESTION_BANK.count, *key) < QUESTION_BANK_TARGET
+
+            while wanted > 0 or harvest:
+                harvest = False
+                fetched = await fetch_questions(
+                    wanted if wanted > 0 else API_MAX,
+                    category,
+                    difficulty
+                )
+                if not fetched:
                     break
-        except Exception:
-            pass
+                await asyncio.to_thread(QUESTION_BANK.add_many, fetched, category, difficulty)
+                if wanted > 0:
+                    wanted -= self.add(key, fetched)
+        except Exception as e:
+            print(f"[POOL] refill failed for {key}: {e!r}")
+
+    async def take(
+        self,
+        category: str,
+        difficulty: str,
+        amount: int,
+        room: str = ""
+    ) -> list[dict]:
+        key = (category, difficulty)
+        pool = self.pools[key]
+
+        # Kall nyckel: banken först, vänta bara på upstream om den inte räcker
+        if len(pool) < amount:
+            self.top_up(key, amount)
+        if len(pool) < amount:
+            await asyncio.shield(self.refill(key, amount))
+
+        room_scope = f"room:{room.upper()}" if room else None
+        questions = []
+        picked = set()
+        seen = []
+
+        while pool and len(questions) < amount:
+            question = pool.popleft()
+            q_hash = question_key(question)
+            if q_hash in picked:
+                continue
+
+            # Rummet har redan fått frågan (t.ex. via en annan kategori) –
+            # den går tillbaka till poolen åt andra rum
+            if room_scope:
+                if QUESTION_INDEX.seen(q_hash, room_scope):
+                    seen.append(question)
+                    continue
+                QUESTION_INDEX.add(q_hash, room_scope)
+
+            picked.add(q_hash)
+            questions.append(question)
+
+        pool.extend(seen)
+
+        if len(pool) < self.low_water:
+            self.refill(key)
+
+        return questions
+
+    def warm(self, keys):
+        for key in keys:
+            self.refill(key)
+
+    async def stop(self):
+        tasks = [t for t in self.refills.values() if not t.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.refills.clear()
+
+
+QUESTION_POOL = QuestionPool(POOL_TARGET, POOL_LOW_WATER)
 
-    # ===== DEDUP-VERIFIERING (TILLFÄLLIG LOGG) =====
-    print(
-        f"[QUIZ] fetched={fetched_total} "
-        f"dedup_skipped={skipped_dedup} "
-        f"returned={len(questions)}"
-    )
 
-    return questions
+@app.get("/quiz")
+async def quiz(
+    amount: int = 10,
+    category: str = "",
+    difficulty: str = "",
+    room: str = ""
+):
+    return await QUESTION_POOL.take(category, difficulty, max(amount, 0), room)
 
-# ================== TV WEBSOCKET (NYTT, ISOLERAT) ==================
+# ================== ROOM WEBSOCKET (PUSH) ==================
 
 from fastapi import WebSocket, WebSocketDisconnect
 
-@app.websocket("/ws/tv/{room}")
-async def tv_websocket(websocket: WebSocket, room: str):
+async def room_websocket(websocket: WebSocket, room: str, role: str, player_id: str | None = None):
+    code = room.upper()
     await websocket.accept()
 
+    if not await store_call(ROOM_STORE.exists, code):
+        await websocket.send_json({"type": "error", "detail": "Room not found"})
+        await websocket.close(code=4404)
+        return
+
+    # Prenumerera före snapshot – en ändring däremellan kommer via kön
+    queue = ROOM_HUB.subscribe(code, role, player_id)
+    snapshot = await store_call(ROOM_HUB.snapshot, code, role, player_id)
+
+    async def pump():
+        while True:
+            payload = await queue.get()
+            await websocket.send_text(payload)
+
+    sender = None
+
     try:
-        # Skicka livstecken direkt när TV:n ansluter
+        # Skicka livstecken + aktuell snapshot direkt när klienten ansluter
         await websocket.send_json({
             "type": "connected",
-            "room": room,
-            "message": "TV ansluten"
+            "room": code,
+            "role": role
         })
+        await websocket.send_text(snapshot)
+
+        sender = asyncio.create_task(pump())
 
-        # Håll anslutningen öppen
+        # Håll anslutningen öppen (klienten skickar "ping" som keepalive)
         while True:
             await websocket.receive_text()
+            ROOM_LIFECYCLE.touch(code)
 
     except WebSocketDisconnect:
         pass
+    finally:
+        if sender:
+            sender.cancel()
+        ROOM_HUB.unsubscribe(code, queue)
+
+
+@app.websocket("/ws/room/{room}")
+async def room_ws(
+    websocket: WebSocket,
+    room: str,
+    role: str = "player",
+    player_id: str | None = None
+):
+    role = role if role in VIEW_ROLES else "player"
+    await room_websocket(websocket, room, role, player_id if role == "player" else None)
+
+
+@app.websocket("/ws/tv/{room}")
+async def tv_websocket(websocket: WebSocket, room: str):
+    await room_websocket(websocket, room, "tv")
+
+
+# ================== METRICS-ENDPOINT ==================
+
+@METRICS.collector
+def collect_rooms() -> list[str]:
+    # Gauges läses av vid scrape; rum räknas per worker (ROOM_LIFECYCLE)
+    with ROOM_LIFECYCLE.lock:
+        codes = list(ROOM_LIFECYCLE.activity)
+        created = ROOM_LIFECYCLE.created
+        evicted = dict(ROOM_LIFECYCLE.evicted)
+
+    players = 0
+    for code in codes:
+        with ROOM_STORE.read(code) as room:
+            if room is not None:
+                players += len(room["players"])
+
+    listeners = {code: dict(queues) for code, queues in list(ROOM_HUB.listeners.items())}
+    sockets = defaultdict(int)
+    for queues in listeners.values():
+        for role, _ in queues.values():
+            sockets[role] += 1
+    waiters = sum(len(w) for w in list(ROOM_HUB.waiters.values()))
+
+    lines = []
+    lines += metric_lines("festquiz_rooms", "gauge", "Live rooms in this worker", [("", (), (), len(codes))])
+    lines += metric_lines("festquiz_players", "gauge", "Players in live rooms", [("", (), (), players)])
+    lines += metric_lines("festquiz_websockets", "gauge", "Open room websockets per role", [
+        ("", ("role",), (role,), sockets[role]) for role in VIEW_ROLES
+    ])
+    lines += metric_lines("festquiz_longpoll_waiters", "gauge", "Parked long-poll requests", [("", (), (), waiters)])
+    lines += metric_lines("festquiz_rooms_created_total", "counter", "Rooms created", [("", (), (), created)])
+    lines += metric_lines("festquiz_rooms_evicted_total", "counter", "Rooms evicted per reason", [
+        ("", ("reason",), (reason,), count) for reason, count in sorted(evicted.items())
+    ])
+    return lines
+
+
+@METRICS.collector
+def collect_caches() -> list[str]:
+    lines = []
+    lines += metric_lines("festquiz_translation_cache_lookups_total", "counter", "Translation cache lookups (memory, disk, miss)", [
+        ("", ("result",), (result,), count) for result, count in sorted(TRANSLATION_CACHE.lookups.items())
+    ])
+    lines += metric_lines("festquiz_qr_cache_lookups_total", "counter", "QR cache lookups (hit, wait, render)", [
+        ("", ("result",), (result,), count) for result, count in sorted(QR_CACHE.lookups.items())
+    ])
+    lines += metric_lines("festquiz_view_cache_lookups_total", "counter", "Room view cache lookups", [
+        ("", ("result",), ("hit",), VIEW_CACHE.hits),
+        ("", ("result",), ("miss",), VIEW_CACHE.misses),
+    ])
+    lines += metric_lines("festquiz_question_bank_total", "counter", "Questions sampled from / harvested into the question bank", [
+        ("", ("result",), (result,), count) for result, count in sorted(QUESTION_BANK.counts.items())
+    ])
+    lines += metric_lines("festquiz_dedup_skipped_total", "counter", "Questions skipped by the dedup index per scope", [
+        ("", ("scope",), (scope,), count) for scope, count in sorted(QUESTION_INDEX.skipped.items())
+    ])
+    return lines
+
+
+@METRICS.collector
+def collect_upstreams() -> list[str]:
+    return metric_lines("festquiz_upstream_circuit_open", "gauge", "1 while the upstream circuit breaker is open", [
+        ("", ("upstream",), (u.name,), int(u.breaker.state == "open")) for u in UPSTREAMS
+    ])
+
+
+@app.get("/metrics")
+def metrics():
+    return Response(
+        METRICS.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+# ================== PROFILERING (FESTQUIZ_PROFILE=1) ==================
+# Bara för felsökning i lasttest – routerna finns inte annars.
+
+if FESTQUIZ_PROFILE:
+    import cProfile
+    import io
+    import pstats
+    import tracemalloc
+
+    PROFILE_LOCK = asyncio.Lock()
+    MEMORY_SNAPSHOT = None
+
+    @app.get("/debug/profile")
+    async def debug_profile(seconds: float = 10, sort: str = "cumulative", limit: int = 40):
+        # Profilerar event-loop-tråden (websockets, long-poll, upstream-anrop)
+        if PROFILE_LOCK.locked():
+            raise HTTPException(status_code=409, detail="Profiling already running")
+
+        async with PROFILE_LOCK:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await asyncio.sleep(min(max(seconds, 0.1), 120))
+            finally:
+                profiler.disable()
+
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(min(max(limit, 1), 500))
+        return Response(out.getvalue(), media_type="text/plain; charset=utf-8")
+
+    @app.get("/debug/memory")
+    def debug_memory(limit: int = 30):
+        # Första anropet startar tracemalloc, därefter diff mot förra anropet
+        global MEMORY_SNAPSHOT
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            MEMORY_SNAPSHOT = tracemalloc.take_snapshot()
+            return Response("tracemalloc started\n", media_type="text/plain; charset=utf-8")
+
+        snapshot = tracemalloc.take_snapshot()
+        stats = snapshot.compare_to(MEMORY_SNAPSHOT, "lineno")
+        MEMORY_SNAPSHOT = snapshot
+
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"current={current} peak={peak}"]
+        lines += [str(stat) for stat in stats[:min(max(limit, 1), 500)]]
+        return Response("\n".join(lines) + "\n", media_type="text/plain; charset=utf-8")